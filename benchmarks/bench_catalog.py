@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Catalog lookup micro-benchmark
+Shows id lookups stay flat as the catalog grows from 1k to 1M fortunes
+
+Usage: python benchmarks/bench_catalog.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fortune_catalog import FortuneCatalog
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+CATEGORIES = ["encouraging", "motivational", "general", "wisdom", "love"]
+LOOKUPS = 10_000
+
+
+def make_fortunes(size):
+    return [
+        {"id": i, "text": f"Fortune number {i}", "category": CATEGORIES[i % len(CATEGORIES)]}
+        for i in range(1, size + 1)
+    ]
+
+
+def linear_lookup(fortunes, fortune_id):
+    """The nested-loop lookup FortuneManager used before the catalog"""
+    for fortune in fortunes:
+        if fortune["id"] == fortune_id:
+            return fortune
+    return None
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'size':>10} {'build (ms)':>12} {'indexed (ns/lookup)':>20} {'linear (us/lookup)':>19}")
+    for size in SIZES:
+        fortunes = make_fortunes(size)
+        build_s = timeit.timeit(lambda: FortuneCatalog(fortunes), number=1)
+        catalog = FortuneCatalog(fortunes)
+        ids = [rng.randint(1, size) for _ in range(LOOKUPS)]
+
+        indexed_s = timeit.timeit(lambda: [catalog.get(i) for i in ids], number=5) / 5
+        # The linear scan is far too slow to repeat 10k times at 1M entries
+        sample = ids[:max(1, LOOKUPS * 1_000 // size // 10)]
+        linear_s = timeit.timeit(lambda: [linear_lookup(fortunes, i) for i in sample], number=1)
+
+        print(f"{size:>10} {build_s * 1e3:>12.1f} "
+              f"{indexed_s / LOOKUPS * 1e9:>20.0f} "
+              f"{linear_s / len(sample) * 1e6:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Catalog format benchmark
+Startup time and peak RSS of loading a JSON vs compiled (mmap) catalog
+and displaying one fortune, each measured in a fresh interpreter
+
+Usage: python benchmarks/bench_catalog_format.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fortune_catalog import compile_catalog
+
+SIZES = [1_000, 100_000, 1_000_000]
+CATEGORIES = ["encouraging", "motivational", "general", "wisdom", "love"]
+
+# Runs in a child process so each measurement starts cold
+PROBE = r"""
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+if {compiled!r}:
+    from fortune_catalog import CompiledCatalog
+    catalog = CompiledCatalog({path!r})
+else:
+    from fortune_catalog import FortuneCatalog
+    with open({path!r}, 'r', encoding='utf-8') as f:
+        catalog = FortuneCatalog(json.load(f))
+loaded = time.perf_counter() - t0
+fortune = catalog.get(len(catalog) // 2)
+shown = time.perf_counter() - t0
+try:
+    # Linux carries ru_maxrss across exec, so prefer this process's own peak
+    with open("/proc/self/status") as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss //= 1024
+print(json.dumps({{"load": loaded, "first_fortune": shown, "rss_kb": rss}}))
+"""
+
+
+def probe(path, compiled):
+    code = PROBE.format(root=ROOT, path=path, compiled=compiled)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    print(f"{'fortunes':>10} {'format':>8} {'file (MB)':>10} {'load (ms)':>10} "
+          f"{'first (ms)':>11} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in SIZES:
+            fortunes = [
+                {"id": i, "text": f"Fortune number {i}: 今日好運 {'*' * (i % 40)}",
+                 "category": CATEGORIES[i % len(CATEGORIES)]}
+                for i in range(1, size + 1)
+            ]
+            json_path = os.path.join(tmp, f"fortunes_{size}.json")
+            bin_path = os.path.join(tmp, f"fortunes_{size}.bin")
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(fortunes, f, indent=2, ensure_ascii=False)
+            compile_catalog(fortunes, bin_path)
+            del fortunes
+
+            for label, path, compiled in (("json", json_path, False), ("compiled", bin_path, True)):
+                result = probe(path, compiled)
+                print(f"{size:>10} {label:>8} {os.path.getsize(path) / 2**20:>10.1f} "
+                      f"{result['load'] * 1e3:>10.1f} {result['first_fortune'] * 1e3:>11.1f} "
+                      f"{result['rss_kb'] / 1024:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
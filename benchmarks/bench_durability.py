@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Durability policy benchmark
+Measures snapshot and journal write throughput under each fsync policy
+
+Usage: python benchmarks/bench_durability.py [history_size]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fortune_storage import DurabilityPolicy, HistoryJournal, atomic_write_json
+
+POLICIES = ["always", "batch:10", "batch:100", "never"]
+SNAPSHOT_WRITES = 50
+JOURNAL_APPENDS = 500
+
+
+def make_user_data(size):
+    start = date(2000, 1, 1)
+    return {
+        "device_id": "0123456789abcdef",
+        "history": [
+            {
+                "date": (start + timedelta(days=i)).isoformat(),
+                "fortune_id": i % 1020 + 1,
+                "timestamp": f"{(start + timedelta(days=i)).isoformat()}T09:00:00"
+            }
+            for i in range(size)
+        ]
+    }
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    user_data = make_user_data(size)
+    entry = user_data["history"][-1]
+
+    print(f"history size: {size}")
+    print(f"{'policy':>10} {'snapshot (ms/write)':>20} {'journal (us/append)':>20}")
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "user_data.json")
+        for spec in POLICIES:
+            policy = DurabilityPolicy.from_env(spec)
+            t0 = time.perf_counter()
+            for _ in range(SNAPSHOT_WRITES):
+                atomic_write_json(snapshot, user_data, policy)
+            snapshot_s = (time.perf_counter() - t0) / SNAPSHOT_WRITES
+
+            policy = DurabilityPolicy.from_env(spec)
+            journal = HistoryJournal(os.path.join(tmp, "user_data.journal"), policy)
+            journal.reset()
+            t0 = time.perf_counter()
+            for _ in range(JOURNAL_APPENDS):
+                journal.append(entry)
+            journal_s = (time.perf_counter() - t0) / JOURNAL_APPENDS
+
+            print(f"{spec:>10} {snapshot_s * 1e3:>20.2f} {journal_s * 1e6:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
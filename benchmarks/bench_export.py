@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Bulk export scaling benchmark
+Fortunes per second from export_fortunes.export for a synthetic user
+cohort as the number of worker processes grows
+
+Usage: python benchmarks/bench_export.py [--users 20000] [--days 365]
+           [--workers 1 2 4 8] [--seed KEY] [--format jsonl|csv]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from export_fortunes import export
+
+
+class NullWriter:
+    """Counts output bytes without keeping them"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text):
+        self.bytes += len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seed", default=None)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    args = parser.parse_args()
+
+    catalog = os.path.join(ROOT, "fortunes.json")
+    start = date(2026, 1, 1)
+    end = start + timedelta(days=args.days - 1)
+    seed = args.seed.encode('utf-8') if args.seed else None
+    users = [f"user-{i}" for i in range(args.users)]
+
+    print(f"users={args.users} days={args.days} format={args.format} "
+          f"mode={'seeded' if seed else 'random'} cpus={os.cpu_count()}")
+    print(f"{'workers':>8} {'fortunes':>12} {'seconds':>8} {'fortunes/s':>12} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        out = NullWriter()
+        t0 = time.perf_counter()
+        rows = export(users, start, end, out, catalog, args.format, workers, seed)
+        elapsed = time.perf_counter() - t0
+        rate = rows / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {rows:>12,} {elapsed:>8.2f} {rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
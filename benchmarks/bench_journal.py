@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+History write benchmark
+Compares the per-fortune cost of rewriting user_data.json against
+appending one record to the history journal, after checking that a
+journal torn by a crash mid-append recovers
+
+Usage: python benchmarks/bench_journal.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fortune_storage import HistoryJournal
+
+SIZES = [10_000, 100_000, 1_000_000]
+APPENDS = 200
+
+
+def make_user_data(size):
+    start = date(2000, 1, 1)
+    history = []
+    for i in range(size):
+        day = start + timedelta(days=i)
+        history.append({
+            "date": day.isoformat(),
+            "fortune_id": i % 1020 + 1,
+            "timestamp": f"{day.isoformat()}T09:00:00.000000"
+        })
+    return {"device_id": "0123456789abcdef", "history": history}
+
+
+def full_rewrite(path, user_data):
+    """What _save_user_data did for every fortune (primary file only)"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(user_data, f, indent=2, default=str)
+
+
+def check_torn_tail(tmp):
+    """A torn last record is dropped and the next append is kept"""
+    path = os.path.join(tmp, "torn.journal")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"date":"2020-01-01","fortune_id":1,"timestamp":"2020-01-01T09:00:00"}\n')
+        f.write('{"date":"2020-01-02","fortune_id":2,"timest')
+
+    journal = HistoryJournal(path)
+    journal.load()
+    journal.append({"date": "2020-01-03", "fortune_id": 3, "timestamp": "2020-01-03T09:00:00"})
+    dates = [entry["date"] for entry in HistoryJournal(path).load()]
+    if dates != ["2020-01-01", "2020-01-03"]:
+        print(f"❌ Torn journal recovered as {dates}")
+        sys.exit(1)
+    print("✅ Torn journal tail recovered")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        check_torn_tail(tmp)
+
+    print(f"{'history':>10} {'rewrite (ms/fortune)':>21} {'journal (us/fortune)':>21} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "user_data.json")
+        for size in SIZES:
+            user_data = make_user_data(size)
+            entry = dict(user_data["history"][-1])
+
+            rounds = max(1, 30_000 // size)
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                full_rewrite(snapshot, user_data)
+            rewrite_s = (time.perf_counter() - t0) / rounds
+
+            journal = HistoryJournal(os.path.join(tmp, "user_data.journal"))
+            journal.reset()
+            t0 = time.perf_counter()
+            for _ in range(APPENDS):
+                journal.append(entry)
+            append_s = (time.perf_counter() - t0) / APPENDS
+
+            print(f"{size:>10} {rewrite_s * 1e3:>21.1f} {append_s * 1e6:>21.1f} "
+                  f"{rewrite_s / append_s:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
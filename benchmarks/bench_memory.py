@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Record memory benchmark
+tracemalloc footprint of 1M fortunes and 1M history entries held as
+plain dicts versus __slots__ records
+
+Usage: python benchmarks/bench_memory.py [count]
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fortune_catalog import FortuneCatalog
+from fortune_history import HistoryStore
+
+CATEGORIES = ["encouraging", "motivational", "general", "wisdom", "love"]
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    # Texts and dates are built up front so only the containers are measured
+    texts = [f"Fortune number {i}" for i in range(count)]
+    dates = [f"{2000 + i // 366:04d}-{i % 12 + 1:02d}-{i % 28 + 1:02d}" for i in range(count)]
+    stamp = "2026-01-01T09:00:00"
+
+    def dict_fortunes():
+        return [{"id": i, "text": texts[i], "category": "".join(CATEGORIES[i % 5])}
+                for i in range(count)]
+
+    def record_fortunes():
+        return FortuneCatalog({"id": i, "text": texts[i], "category": "".join(CATEGORIES[i % 5])}
+                              for i in range(count))
+
+    def dict_history():
+        return [{"date": dates[i], "fortune_id": i, "timestamp": stamp} for i in range(count)]
+
+    def record_history():
+        return HistoryStore([{"date": dates[i], "fortune_id": i, "timestamp": stamp}
+                             for i in range(count)])
+
+    print(f"{count} items")
+    print(f"{'representation':>28} {'retained (MB)':>14} {'peak (MB)':>10}")
+    for label, build in (("fortunes as dicts", dict_fortunes),
+                         ("FortuneCatalog of Fortune", record_fortunes),
+                         ("history as dicts", dict_history),
+                         ("HistoryStore of HistoryEntry", record_history)):
+        current, peak = measure(build)
+        print(f"{label:>28} {current / 2**20:>14.1f} {peak / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Backup restore benchmark
+Measures how long finding and loading the newest backup takes when every
+file access in a backup location is slow (as on cloud-synced folders),
+reading locations one after another versus discovering them in parallel
+
+Usage: python benchmarks/bench_restore.py [history_size] [latency_ms]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fortune_backup import BackupManager
+
+RUNS = 5
+
+
+class SlowBackupManager(BackupManager):
+    """Adds a fixed delay to each info and backup file read"""
+
+    def __init__(self, locations, latency, stall=None):
+        super().__init__(locations)
+        self.latency = latency
+        # One location that does not answer for this many seconds
+        self.stall = stall
+
+    def read_info(self, backup_dir):
+        delay = self.stall if self.stall and backup_dir == self.locations[0] else self.latency
+        time.sleep(delay)
+        return super().read_info(backup_dir)
+
+    def load(self, backup_dir, info=None):
+        time.sleep(self.latency)
+        return super().load(backup_dir, info)
+
+
+def sequential_latest(backups):
+    """The previous strategy: read and load every location in turn"""
+    best, latest = None, None
+    for backup_dir in backups.locations:
+        info = backups.read_info(backup_dir)
+        if not info or (latest is not None and info["timestamp"] <= latest):
+            continue
+        data = backups.load(backup_dir, info)
+        if data and data.get("history"):
+            best, latest = data, info["timestamp"]
+    return best
+
+
+def parallel_latest(backups):
+    """What restore does: discover all locations at once, load the newest"""
+    for backup_dir, info in backups.discover():
+        data = backups.load(backup_dir, info)
+        if data and data.get("history") and backups.verify(data, info):
+            return data
+    return None
+
+
+def make_user_data(size):
+    start = date(2000, 1, 1)
+    return {
+        "device_id": "0123456789abcdef",
+        "history": [
+            {
+                "date": (start + timedelta(days=i)).isoformat(),
+                "fortune_id": i % 1020 + 1,
+                "timestamp": f"{(start + timedelta(days=i)).isoformat()}T09:00:00"
+            }
+            for i in range(size)
+        ]
+    }
+
+
+def median_ms(fn):
+    times = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+        assert result and result["history"], "no backup found"
+    return sorted(times)[RUNS // 2] * 1e3
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 200) / 1e3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        locations = [os.path.join(tmp, name) for name in ("documents", "desktop", "home")]
+        user_data = make_user_data(size)
+        writer = BackupManager(locations)
+        writer.backup(user_data)
+        # Make the locations disagree, as after a run with one unreachable
+        user_data["history"].pop()
+        BackupManager(locations[:2]).backup(user_data)
+
+        fast = BackupManager(locations)
+        slow = SlowBackupManager(locations, latency)
+        stalled = SlowBackupManager(locations, latency, stall=10.0)
+
+        print(f"history size: {size}, {latency * 1e3:.0f} ms per file access, median of {RUNS} runs")
+        print(f"{'case':>28} {'sequential (ms)':>16} {'parallel (ms)':>14}")
+        print(f"{'local disk':>28} {median_ms(lambda: sequential_latest(fast)):>16.1f} "
+              f"{median_ms(lambda: parallel_latest(fast)):>14.1f}")
+        print(f"{'slow locations':>28} {median_ms(lambda: sequential_latest(slow)):>16.1f} "
+              f"{median_ms(lambda: parallel_latest(slow)):>14.1f}")
+        print(f"{'one location stalled 10 s':>28} {'-':>16} "
+              f"{median_ms(lambda: parallel_latest(stalled)):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
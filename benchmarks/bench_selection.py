@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Fortune selection benchmark
+Per-draw cost of FortuneSelector and DeterministicSelector versus
+rebuilding the filtered candidate list, for 1k to 1M fortune catalogs
+
+Usage: python benchmarks/bench_selection.py [window]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fortune_catalog import FortuneCatalog
+from fortune_selection import DeterministicSelector, FortuneSelector
+
+SIZES = [1_000, 100_000, 1_000_000]
+DRAWS = 2_000
+
+
+def filtered_draw(catalog, recent_ids, rng):
+    """The list-rebuilding selection generate_fortune used to do"""
+    available = [f for f in catalog if f["id"] not in recent_ids]
+    return rng.choice(available or catalog)
+
+
+def main():
+    window = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    print(f"exclusion window: {window}")
+    print(f"{'fortunes':>10} {'selector (us/draw)':>19} {'seeded (us/draw)':>17} "
+          f"{'filtered (us/draw)':>19}")
+    for size in SIZES:
+        catalog = FortuneCatalog({"id": i, "text": "", "category": "general"}
+                                 for i in range(1, size + 1))
+
+        selector = FortuneSelector(catalog, window, random.Random(1))
+        t0 = time.perf_counter()
+        for _ in range(DRAWS):
+            selector.record(selector.draw()["id"])
+        selector_s = (time.perf_counter() - t0) / DRAWS
+
+        seeded = DeterministicSelector(catalog, b"bench")
+        start = date(2026, 1, 1)
+        t0 = time.perf_counter()
+        for day in range(DRAWS):
+            seeded.fortune_for(f"user-{day % 100}", start + timedelta(days=day))
+        seeded_s = (time.perf_counter() - t0) / DRAWS
+
+        rng = random.Random(1)
+        recent = []
+        draws = max(5, DRAWS * 1_000 // size)
+        t0 = time.perf_counter()
+        for _ in range(draws):
+            fortune = filtered_draw(catalog, set(recent[-window:]), rng)
+            recent.append(fortune["id"])
+        filtered_s = (time.perf_counter() - t0) / draws
+
+        print(f"{size:>10} {selector_s * 1e6:>19.2f} {seeded_s * 1e6:>17.2f} "
+              f"{filtered_s * 1e6:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+User data serialization benchmark
+Measures save and load time, file size and peak RSS of user_data.json
+for the pretty-printed format, the compact format with each installed
+JSON backend, and the streaming loader
+
+Before timing, checks that history recovered from a damaged
+user_data.json survives two restarts.
+
+Usage: python benchmarks/bench_serialization.py [size ...]
+Each measurement runs in a fresh interpreter. Peak is the high-water RSS
+growth during the operation (Linux /proc; elsewhere ru_maxrss, which
+includes everything since the process started).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+RUNS = 3
+
+PROBE = r"""
+import json, os, resource, sys, time
+sys.path.insert(0, {root!r})
+os.environ["DAILYFORTUNE_JSON"] = {backend!r}
+import fortune_storage
+from fortune_records import HistoryEntry
+from fortune_storage import atomic_write_json, json_default, read_json
+
+def status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+def start_peak():
+    try:
+        # Reset the high-water mark to the current RSS
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return status_kb("VmRSS")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def peak_kb():
+    try:
+        return status_kb("VmHWM")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+op, path = {op!r}, {path!r}
+if op == "save":
+    with open(path, 'rb') as f:
+        data = json.load(f)
+    data["history"] = [HistoryEntry.from_mapping(e) for e in data["history"]]
+    out = path + ".out"
+    base = start_peak()
+    t0 = time.perf_counter()
+    if {pretty!r}:
+        atomic_write_json(out, data, indent=2, default=json_default)
+    else:
+        atomic_write_json(out, data)
+    elapsed = time.perf_counter() - t0
+    size = os.path.getsize(out)
+    os.remove(out)
+else:
+    fortune_storage.STREAM_THRESHOLD = 0 if op == "stream" else float("inf")
+    base = start_peak()
+    t0 = time.perf_counter()
+    if op == "json.load":
+        # What loading cost before: parse, then HistoryStore converts to records
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data["history"] = [HistoryEntry.from_mapping(e) for e in data["history"]]
+    else:
+        data = read_json(path, "history", HistoryEntry.from_mapping)
+    elapsed = time.perf_counter() - t0
+    size = os.path.getsize(path)
+print(json.dumps({{"seconds": elapsed, "rss_kb": peak_kb() - base, "bytes": size}}))
+"""
+
+
+def installed_backends():
+    backends = ["json"]
+    for name in ("ujson", "orjson"):
+        try:
+            __import__(name)
+            backends.append(name)
+        except ImportError:
+            pass
+    return backends
+
+
+def write_user_data(path, size, pretty):
+    history = [
+        {
+            "date": f"{2000 + i // 365:04d}-{i // 31 % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "fortune_id": i % 1020 + 1,
+            "timestamp": f"{2000 + i // 365:04d}-01-01T09:00:00.{i % 1000000:06d}"
+        }
+        for i in range(size)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"device_id": "0123456789abcdef", "history": history}, f,
+                  indent=2 if pretty else None, separators=None if pretty else (',', ':'))
+
+
+def probe(op, path, backend="json", pretty=False):
+    code = PROBE.format(root=ROOT, op=op, path=path, backend=backend, pretty=pretty)
+    results = []
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.strip())
+        results.append(json.loads(out.stdout))
+    results.sort(key=lambda r: r["seconds"])
+    return results[RUNS // 2]
+
+
+def row(label, result):
+    print(f"{label:>26} {result['seconds'] * 1e3:>10.1f} {result['rss_kb'] / 1024:>10.1f} "
+          f"{result['bytes'] / 1e6:>10.2f}")
+
+
+def check_damaged_reload(tmp):
+    """Good entries of a file with a malformed one are kept across two restarts"""
+    sys.path.insert(0, ROOT)
+    from fortune_backup import HistoryDigest
+    from fortune_data import FortuneManager
+
+    app_dir = os.path.join(tmp, ".dailyfortune")
+    os.makedirs(app_dir)
+    history = [
+        {"date": f"2000-{i // 28 + 1:02d}-{i % 28 + 1:02d}", "fortune_id": 1,
+         "timestamp": f"2000-{i // 28 + 1:02d}-{i % 28 + 1:02d}T09:00:00"}
+        for i in range(101)
+    ]
+    user_data = {"device_id": "0123456789abcdef", "history": history}
+    # A digest of the good entries, as a save by this version leaves it
+    user_data["history_digest"] = HistoryDigest.of(user_data).to_dict()
+    history.append({"date": "2000-12-01"})  # Malformed: no fortune_id
+    with open(os.path.join(app_dir, "user_data.json"), 'w', encoding='utf-8') as f:
+        json.dump(user_data, f)
+    with open(os.path.join(app_dir, "user_data.journal"), 'w', encoding='utf-8') as f:
+        for day in range(1, 20):
+            f.write(json.dumps({"date": f"2001-01-{day:02d}", "fortune_id": 2,
+                                "timestamp": f"2001-01-{day:02d}T09:00:00"}) + "\n")
+
+    home = os.environ.get("HOME")
+    os.environ["HOME"] = tmp
+    counts = []
+    try:
+        for _ in range(2):
+            manager = FortuneManager(lazy=True, watch_catalog=False)
+            manager.backups.locations = []  # Only the primary files count here
+            counts.append(len(manager.history))
+            manager.close()
+    finally:
+        if home is None:
+            del os.environ["HOME"]
+        else:
+            os.environ["HOME"] = home
+    if counts != [120, 120]:
+        print(f"❌ Recovered history lost on reload: {counts[0]} then {counts[1]} entries")
+        sys.exit(1)
+    print("✅ Recovered history kept across reloads")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    with tempfile.TemporaryDirectory() as tmp:
+        check_damaged_reload(tmp)
+
+    backends = installed_backends()
+    print(f"backends: {', '.join(backends)}; median of {RUNS} runs")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            pretty_path = os.path.join(tmp, f"pretty_{size}.json")
+            compact_path = os.path.join(tmp, f"compact_{size}.json")
+            write_user_data(pretty_path, size, pretty=True)
+            write_user_data(compact_path, size, pretty=False)
+
+            print(f"\nhistory size: {size}")
+            print(f"{'case':>26} {'time (ms)':>10} {'peak (MB)':>10} {'file (MB)':>10}")
+            row("save pretty (json)", probe("save", pretty_path, pretty=True))
+            for backend in backends:
+                row(f"save compact ({backend})", probe("save", compact_path, backend))
+            row("load pretty (json.load)", probe("json.load", pretty_path))
+            for backend in backends:
+                row(f"load compact ({backend})", probe("load", compact_path, backend))
+            row("load compact (streaming)", probe("stream", compact_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Startup timing harness
+Measures time-to-first-paint of the Tk window (the fortune area exposed
+and redrawn) with eager and lazy FortuneManager initialization, each in
+a fresh interpreter with a synthetic history in a temporary HOME
+
+Usage: python benchmarks/bench_startup.py [history_size]
+Requires a display (use xvfb-run on headless machines).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+import gui
+app = gui.FortuneApp(lazy={lazy!r})
+root = app.root
+painted = []
+# First paint is when the fortune area has been exposed and redrawn
+app.fortune_text.bind("<Expose>", lambda e: painted or painted.append(time.perf_counter()), add="+")
+while not painted:
+    root.update()
+root.update_idletasks()
+first_paint = time.perf_counter() - t0
+while app.fortune_text.get("1.0", "end-1c") == "載入中...":
+    root.update()
+ready = time.perf_counter() - t0
+app.fortune_manager.close()
+root.destroy()
+print(json.dumps({{"first_paint": first_paint, "ready": ready}}))
+"""
+
+
+def write_history(home, size):
+    app_dir = os.path.join(home, ".dailyfortune")
+    os.makedirs(app_dir)
+    start = date.today() - timedelta(days=size)
+    history = [
+        {
+            "date": (start + timedelta(days=i)).isoformat(),
+            "fortune_id": i % 1020 + 1,
+            "timestamp": f"{(start + timedelta(days=i)).isoformat()}T09:00:00"
+        }
+        for i in range(size)
+    ]
+    with open(os.path.join(app_dir, "user_data.json"), 'w', encoding='utf-8') as f:
+        json.dump({"device_id": "benchmark", "history": history}, f)
+
+
+def probe(home, lazy):
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    code = PROBE.format(root=ROOT, lazy=lazy)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "probe failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"history size: {size}, median of {RUNS} runs")
+    print(f"{'mode':>6} {'first paint (ms)':>17} {'ready (ms)':>11}")
+    with tempfile.TemporaryDirectory() as home:
+        write_history(home, size)
+        for label, lazy in (("eager", False), ("lazy", True)):
+            try:
+                results = [probe(home, lazy) for _ in range(RUNS)]
+            except RuntimeError as e:
+                print(f"Cannot start the GUI: {e}")
+                sys.exit(1)
+            paint = sorted(r["first_paint"] for r in results)[RUNS // 2]
+            ready = sorted(r["ready"] for r in results)[RUNS // 2]
+            print(f"{label:>6} {paint * 1e3:>17.1f} {ready * 1e3:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
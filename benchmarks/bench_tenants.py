@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant throughput benchmark
+Fortunes per second served by MultiTenantFortuneManager for a simulated
+user population, with write-back LRU caching
+
+Usage: python benchmarks/bench_tenants.py [--users 10000 1000000]
+           [--store files|sqlite|memory] [--cache-size N] [--days D]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fortune_catalog import load_catalog
+from fortune_sqlite import SQLiteStore
+from fortune_storage import DurabilityPolicy
+from fortune_tenants import MemoryUserStore, MultiTenantFortuneManager, ShardedFileUserStore
+
+
+def run(users, store, cache_size, days, catalog):
+    manager = MultiTenantFortuneManager(catalog, store, cache_size=cache_size)
+    rng = random.Random(7)
+    start = date(2026, 1, 1)
+    requests = 0
+    t0 = time.perf_counter()
+    for day in range(days):
+        on_date = start + timedelta(days=day)
+        # Visit users in a shuffled order each day, as real traffic would
+        order = list(range(users))
+        rng.shuffle(order)
+        for user in order:
+            manager.generate_fortune(f"user-{user}", on_date)
+            requests += 1
+    serve_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    manager.close()
+    flush_s = time.perf_counter() - t0
+    return requests, serve_s, flush_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--store", choices=["files", "sqlite", "memory"], default="files")
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=2)
+    args = parser.parse_args()
+
+    catalog = load_catalog(os.path.join(ROOT, "fortunes.json"))
+    print(f"store={args.store} cache_size={args.cache_size} days={args.days}")
+    print(f"{'users':>10} {'fortunes':>10} {'fortunes/s':>11} {'final flush (s)':>16}")
+    for users in args.users:
+        with tempfile.TemporaryDirectory() as tmp:
+            if args.store == "files":
+                store = ShardedFileUserStore(tmp, DurabilityPolicy(DurabilityPolicy.NEVER))
+            elif args.store == "sqlite":
+                store = SQLiteStore(os.path.join(tmp, "fortunes.db"))
+            else:
+                store = MemoryUserStore()
+            requests, serve_s, flush_s = run(users, store, args.cache_size, args.days, catalog)
+        print(f"{users:>10} {requests:>10} {requests / serve_s:>11.0f} {flush_s:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator for fortune_server.py
+Keep-alive clients issue a mixed read/generate workload and report
+throughput and p50/p99 latency per endpoint
+
+Usage: python benchmarks/load_generator.py [--host 127.0.0.1] [--port 8080]
+           [--connections 64] [--duration 10] [--users 10000] [--spawn]
+
+With --spawn a server is started on a temporary data directory first.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (endpoint name, weight)
+WORKLOAD = [
+    ("today", 50),
+    ("stats", 20),
+    ("by_date", 10),
+    ("history", 10),
+    ("generate", 10),
+]
+
+
+def build_request(kind, user, rng, host):
+    if kind == "generate":
+        method, path = "POST", f"/users/{user}/generate"
+    elif kind == "today":
+        method, path = "GET", f"/users/{user}/today"
+    elif kind == "stats":
+        method, path = "GET", f"/users/{user}/stats"
+    elif kind == "by_date":
+        day = date.today() - timedelta(days=rng.randrange(30))
+        method, path = "GET", f"/users/{user}/fortunes/{day.isoformat()}"
+    else:
+        start = date.today() - timedelta(days=30)
+        method, path = "GET", f"/users/{user}/history?start={start.isoformat()}&end={date.today().isoformat()}"
+    return (f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Length: 0\r\n\r\n").encode('ascii')
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode('latin-1').split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, deadline, users, seed, latencies, statuses):
+    rng = random.Random(seed)
+    kinds = [k for k, _ in WORKLOAD]
+    weights = [w for _, w in WORKLOAD]
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            request = build_request(kind, f"user-{rng.randrange(users)}", rng, host)
+            t0 = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await read_response(reader)
+            latencies[kind].append(time.perf_counter() - t0)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def wait_for_server(host, port, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run(args):
+    await wait_for_server(args.host, args.port)
+    latencies = defaultdict(list)
+    statuses = defaultdict(int)
+    deadline = time.perf_counter() + args.duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        client(args.host, args.port, deadline, args.users, seed, latencies, statuses)
+        for seed in range(args.connections)
+    ))
+    elapsed = time.perf_counter() - t0
+
+    everything = sorted(v for values in latencies.values() for v in values)
+    print(f"connections={args.connections} users={args.users} duration={elapsed:.1f}s")
+    print(f"{'endpoint':>10} {'requests':>10} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for kind, _ in WORKLOAD + [("all", 0)]:
+        values = everything if kind == "all" else sorted(latencies[kind])
+        print(f"{kind:>10} {len(values):>10} "
+              f"{percentile(values, 0.50) * 1000:>9.2f} {percentile(values, 0.99) * 1000:>9.2f}")
+    print(f"throughput: {len(everything) / elapsed:,.0f} requests/s")
+    print("status codes: " + ", ".join(f"{code}={n}" for code, n in sorted(statuses.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--spawn", action="store_true", help="start a server on a temporary data dir")
+    parser.add_argument("--store", choices=["files", "sqlite"], default="files")
+    args = parser.parse_args()
+
+    server = None
+    with tempfile.TemporaryDirectory() as data_dir:
+        if args.spawn:
+            server = subprocess.Popen([
+                sys.executable, os.path.join(ROOT, "fortune_server.py"),
+                "--host", args.host, "--port", str(args.port),
+                "--data-dir", data_dir, "--store", args.store,
+            ], stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(run(args))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
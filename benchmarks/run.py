@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+FortuneManager benchmark suite
+Times the manager's hot paths on synthetic catalogs and histories in a
+temporary HOME, and writes the results as JSON so runs from different
+commits can be compared
+
+Usage: python benchmarks/run.py [--sizes 1000,10000,100000,1000000]
+           [--repeat 7] [--only NAME,...] [--no-memory] [--output FILE]
+       python benchmarks/run.py --compare BASELINE.json [CURRENT.json]
+           [--threshold 0.1]
+
+Each size is used for both the catalog and the history. Calls are timed
+with timeit (stateful ones one call at a time, with untimed setup in
+between) and the median is reported; peak allocation comes from one
+extra call under tracemalloc. The clock and the random generator are
+fixed, so runs are repeatable. With --compare and no CURRENT file the
+suite is run first; regressions beyond the threshold exit with status 1.
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fortune_data
+import fortune_storage
+from fortune_data import FortuneManager
+from fortune_history import HistoryStore
+from fortune_records import HistoryEntry
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+HISTORY_START = date(2000, 1, 1)
+CATEGORIES = ["love", "career", "health", "wisdom", "luck", "friendship"]
+
+
+class BenchDate(date):
+    """date with a settable today(), patched into fortune_data"""
+
+    current = HISTORY_START
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+
+def write_catalog(path, size):
+    fortunes = [{"id": i, "text": f"Fortune number {i}: patience brings reward {i % 97}",
+                 "category": CATEGORIES[i % len(CATEGORIES)]}
+                for i in range(1, size + 1)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(fortunes, f, ensure_ascii=False)
+
+
+def write_history(path, size, catalog_size):
+    history = [
+        {
+            "date": (HISTORY_START + timedelta(days=i)).isoformat(),
+            "fortune_id": i * 7919 % catalog_size + 1,
+            "timestamp": f"{(HISTORY_START + timedelta(days=i)).isoformat()}T09:00:00.000000"
+        }
+        for i in range(size)
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"device_id": "0123456789abcdef", "history": history}, f,
+                  separators=(',', ':'))
+
+
+def measure(fn, setup=None, repeat=7, memory=True):
+    """Seconds per call over ``repeat`` rounds, plus peak traced bytes of one call"""
+    if setup is None:
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        times = [total / number for total in timer.repeat(repeat, number)]
+    else:
+        times = []
+        for _ in range(repeat):
+            setup()
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+
+    peak = None
+    if memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "runs": len(times),
+        "peak_bytes": peak
+    }
+
+
+def cases(manager, size):
+    """(name, fn, setup) for every benchmark, in run order"""
+    lookups = [(HISTORY_START + timedelta(days=random.randrange(size))).isoformat()
+               for _ in range(1000)]
+    lookup = itertools.cycle(lookups)
+
+    def next_day():
+        manager.flush_backups()
+        BenchDate.current += timedelta(days=1)
+
+    def new_entry():
+        manager.flush_backups()
+        BenchDate.current += timedelta(days=1)
+        entry = HistoryEntry(BenchDate.current.isoformat(), 1,
+                             f"{BenchDate.current.isoformat()}T09:00:00")
+        manager.history.append(entry)
+        manager.digest.extend([entry])  # as generate_fortune does
+
+    primary = {}
+
+    def drop_history():
+        manager.flush_backups()
+        if not primary:
+            primary.update(manager.user_data)
+        manager.user_data = {"device_id": primary["device_id"], "history": []}
+        manager.history = HistoryStore(manager.user_data["history"])
+
+    def restore_history():
+        manager.flush_backups()
+        if primary:
+            manager.user_data = dict(primary)
+            manager.history = HistoryStore(manager.user_data["history"])
+
+    return [
+        ("_load_fortunes", manager._load_fortunes, None),
+        ("_load_user_data", manager._load_user_data, None),
+        ("generate_fortune", manager.generate_fortune, next_day),
+        ("get_todays_fortune", manager.get_todays_fortune, None),
+        ("get_fortune_by_date", lambda: manager.get_fortune_by_date(next(lookup)), None),
+        ("get_available_dates", manager.get_available_dates, None),
+        ("get_stats", manager.get_stats, None),
+        ("_create_backup", lambda: (manager._create_backup(), manager.flush_backups()), new_entry),
+        ("_try_restore_from_backup[clean]", manager._try_restore_from_backup, restore_history),
+        ("_try_restore_from_backup[empty]", manager._try_restore_from_backup, drop_history),
+    ]
+
+
+def run_size(size, repeat, only, memory, results):
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = os.environ["USERPROFILE"] = home
+        catalog_path = os.path.join(home, "fortunes.json")
+        write_catalog(catalog_path, size)
+        os.makedirs(os.path.join(home, ".dailyfortune"))
+        write_history(os.path.join(home, ".dailyfortune", "user_data.json"), size, size)
+
+        random.seed(size)
+        BenchDate.current = HISTORY_START + timedelta(days=size - 1)
+        manager = FortuneManager(lazy=True, watch_catalog=False)
+        manager.fortunes_file = catalog_path
+        manager.compiled_fortunes_file = os.path.join(home, "fortunes.bin")
+        try:
+            manager.preload()
+            manager._create_backup()
+            manager.flush_backups()
+            for name, fn, setup in cases(manager, size):
+                if only and name not in only:
+                    continue
+                print(f"  {name} ...", end="", file=sys.stderr, flush=True)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = measure(fn, setup, repeat, memory)
+                results.setdefault(name, {})[str(size)] = result
+                print(f" {result['median_s'] * 1e3:.3f} ms", file=sys.stderr)
+        finally:
+            manager.close()
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(sizes, repeat, only, memory):
+    original_date, original_home = fortune_data.date, dict(os.environ)
+    fortune_data.date = BenchDate
+    results = {}
+    try:
+        for size in sizes:
+            print(f"size {size}", file=sys.stderr)
+            run_size(size, repeat, only, memory, results)
+    finally:
+        fortune_data.date = original_date
+        os.environ.clear()
+        os.environ.update(original_home)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "json_backend": fortune_storage.JSON_BACKEND,
+            "fsync": os.environ.get("DAILYFORTUNE_FSYNC", "always"),
+            "sizes": sizes,
+            "repeat": repeat
+        },
+        "results": results
+    }
+
+
+def print_results(report):
+    print(f"commit {report['meta']['commit']}, python {report['meta']['python']}")
+    print(f"{'benchmark':>34} {'size':>9} {'median (ms)':>12} {'peak (KB)':>10}")
+    for name, by_size in report["results"].items():
+        for size, result in by_size.items():
+            peak = "-" if result["peak_bytes"] is None else f"{result['peak_bytes'] / 1024:.0f}"
+            print(f"{name:>34} {size:>9} {result['median_s'] * 1e3:>12.3f} {peak:>10}")
+
+
+def compare(baseline, current, threshold):
+    """Print median changes; returns the number of regressions"""
+    print(f"baseline {baseline['meta']['commit']} -> current {current['meta']['commit']}")
+    print(f"{'benchmark':>34} {'size':>9} {'base (ms)':>10} {'now (ms)':>10} {'change':>8}")
+    regressions = 0
+    for name, by_size in current["results"].items():
+        for size, result in by_size.items():
+            base = baseline["results"].get(name, {}).get(size)
+            if base is None:
+                continue
+            change = result["median_s"] / base["median_s"] - 1 if base["median_s"] else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  slower"
+                regressions += 1
+            elif change < -threshold:
+                flag = "  faster"
+            print(f"{name:>34} {size:>9} {base['median_s'] * 1e3:>10.3f} "
+                  f"{result['median_s'] * 1e3:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FortuneManager hot paths")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES),
+                        help="comma-separated catalog/history sizes")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--only", default="", help="comma-separated benchmark names")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peaks")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--compare", nargs="+", metavar="FILE",
+                        help="BASELINE [CURRENT]: compare results files")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    baseline = current = None
+    if args.compare:
+        if len(args.compare) > 2:
+            parser.error("--compare takes a baseline and at most one current file")
+        try:
+            with open(args.compare[0], 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            if len(args.compare) == 2:
+                with open(args.compare[1], 'r', encoding='utf-8') as f:
+                    current = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"❌ Error reading results: {e}")
+            sys.exit(2)
+
+    if current is None:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+        only = {name.strip() for name in args.only.split(",") if name.strip()}
+        current = run(sizes, args.repeat, only, not args.no_memory)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(current, f, indent=2)
+            print(f"✅ Results written to {args.output}")
+        if baseline is None:
+            print_results(current)
+
+    if baseline is not None:
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"❌ {regressions} benchmark(s) slower than baseline by more than "
+                  f"{args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
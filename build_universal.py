@@ -89,6 +89,18 @@ class UniversalBuilder:
         self.build_dir.mkdir()
         print(f"✅ Created {self.build_dir}")
 
+    def compile_catalog(self):
+        """Precompile fortunes.json into the memory-mapped fortunes.bin"""
+        return self.run_command([sys.executable, "compile_fortunes.py", "fortunes.json", "fortunes.bin"],
+                                "Compiling fortune catalog")
+
+    def catalog_data_args(self, separator):
+        """PyInstaller --add-data arguments for the fortune catalog files"""
+        args = ["--add-data", f"fortunes.json{separator}."]
+        if Path("fortunes.bin").exists():
+            args.extend(["--add-data", f"fortunes.bin{separator}."])
+        return args
+
     def build_windows(self):
         """Build Windows executable"""
         print("🖥️  Building for Windows...")
@@ -99,7 +111,7 @@ class UniversalBuilder:
             "--onefile",
             "--windowed",
             "--name", self.app_name,
-            "--add-data", "fortunes.json;.",  # Windows uses semicolon
+            *self.catalog_data_args(";"),  # Windows uses semicolon
             "--distpath", str(self.build_dir),
             "main.py"
         ]
@@ -123,7 +135,7 @@ class UniversalBuilder:
             "--onefile",
             "--windowed",
             "--name", self.app_name,
-            "--add-data", "fortunes.json:.",  # macOS/Linux uses colon
+            *self.catalog_data_args(":"),  # macOS/Linux uses colon
             "--distpath", str(self.build_dir),
             "main.py"
         ]
@@ -149,7 +161,7 @@ class UniversalBuilder:
             "--onefile", 
             "--windowed",
             "--name", self.app_name,
-            "--add-data", "fortunes.json:.",
+            *self.catalog_data_args(":"),
             "--distpath", str(self.build_dir),
             "main.py"
         ]
@@ -258,6 +270,11 @@ Built with ❤️ using Python and PyInstaller
         # Clean previous builds
         self.clean_build()
         
+        # The app falls back to fortunes.json if compiling fails
+        if not self.compile_catalog():
+            print("⚠️  Continuing without compiled catalog")
+            Path("fortunes.bin").unlink(missing_ok=True)
+        
         # Build for current platform
         success = False
         if self.system == "windows":
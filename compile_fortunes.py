@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Fortune Catalog Compiler
+Converts fortunes.json into the memory-mapped fortunes.bin format
+
+Usage: python compile_fortunes.py [fortunes.json] [fortunes.bin]
+"""
+
+import json
+import os
+import sys
+
+from fortune_catalog import compile_catalog
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "fortunes.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0] + ".bin"
+
+    try:
+        with open(source, 'r', encoding='utf-8') as f:
+            fortunes = json.load(f)
+        count = compile_catalog(fortunes, target)
+    except Exception as e:
+        print(f"❌ Error compiling {source}: {e}")
+        sys.exit(1)
+
+    size_kb = os.path.getsize(target) / 1024
+    print(f"✅ Compiled {count} fortunes into {target} ({size_kb:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Bulk Fortune Export
+Precomputes fortunes for many users over a date range, in parallel,
+without touching any user data files
+
+Usage: python export_fortunes.py USERS_FILE START END [--output FILE]
+           [--format jsonl|csv] [--workers N] [--seed KEY]
+           [--catalog fortunes.json] [--window 30] [--chunk-size 500]
+
+USERS_FILE has one user id per line ("-" reads stdin); START and END are
+inclusive YYYY-MM-DD dates. With --seed the fortunes match what a
+seeded FortuneManager or fortune_server.py would serve; otherwise each
+user gets random draws that honor the same no-repeat window.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+from fortune_catalog import load_catalog
+from fortune_selection import DeterministicSelector, FortuneSelector
+
+CSV_FIELDS = ["user_id", "date", "fortune_id", "category", "text"]
+
+# Per-process state set up by _init_worker
+_catalog = None
+_deterministic = None
+
+
+def _init_worker(catalog_path: str, seed: Optional[bytes]):
+    global _catalog, _deterministic
+    _catalog = load_catalog(catalog_path)
+    _deterministic = DeterministicSelector(_catalog, seed) if seed else None
+
+
+def _precompute_chunk(user_ids: List[str], start: date, days: int, window: int, fmt: str) -> str:
+    """Fortunes for a chunk of users, rendered as output text"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if fmt == "csv" else None
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    for user_id in user_ids:
+        selector = None if _deterministic else FortuneSelector(_catalog, window)
+        for day in dates:
+            if selector is None:
+                fortune = _deterministic.fortune_for(user_id, day)
+            else:
+                fortune = selector.draw()
+                selector.record(fortune["id"])
+            if writer is not None:
+                writer.writerow([user_id, day.isoformat(), fortune["id"],
+                                 fortune.get("category", ""), fortune["text"]])
+            else:
+                buffer.write(json.dumps({
+                    "user_id": user_id,
+                    "date": day.isoformat(),
+                    "fortune_id": fortune["id"],
+                    "category": fortune.get("category", ""),
+                    "text": fortune["text"]
+                }, ensure_ascii=False))
+                buffer.write("\n")
+    return buffer.getvalue()
+
+
+def _chunks(user_ids: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for user_id in user_ids:
+        chunk.append(user_id)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def export(user_ids: Iterable[str], start: date, end: date, out: TextIO,
+           catalog_path: str, fmt: str = "jsonl", workers: Optional[int] = None,
+           seed: Optional[bytes] = None, window: int = 30, chunk_size: int = 500) -> int:
+    """Write fortunes for every user and day to ``out``; returns the row count.
+
+    Users are split into chunks that worker processes render to text.
+    Chunks are written in input order, and at most two per worker are in
+    flight, so memory stays bounded for any cohort size.
+    """
+    if fmt not in ("jsonl", "csv"):
+        raise ValueError(f"Unknown format: {fmt}")
+    days = (end - start).days + 1
+    if days < 1:
+        raise ValueError("END must not be before START")
+
+    if fmt == "csv":
+        out.write(",".join(CSV_FIELDS) + "\n")
+
+    workers = workers or os.cpu_count() or 1
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(catalog_path, seed)) as executor:
+        pending = deque()
+        for chunk in _chunks(user_ids, chunk_size):
+            pending.append((len(chunk), executor.submit(
+                _precompute_chunk, chunk, start, days, window, fmt)))
+            if len(pending) >= workers * 2:
+                users, future = pending.popleft()
+                out.write(future.result())
+                rows += users * days
+        while pending:
+            users, future = pending.popleft()
+            out.write(future.result())
+            rows += users * days
+    return rows
+
+
+def _read_users(path: str) -> Iterator[str]:
+    source = sys.stdin if path == "-" else open(path, 'r', encoding='utf-8')
+    try:
+        for line in source:
+            user_id = line.strip()
+            if user_id:
+                yield user_id
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Precompute fortunes for many users")
+    parser.add_argument("users_file")
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat)
+    parser.add_argument("--output", default="-")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", default=os.environ.get("DAILYFORTUNE_SEED"))
+    parser.add_argument("--catalog", default=os.path.join(here, "fortunes.json"))
+    parser.add_argument("--window", type=int, default=30)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    out = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        rows = export(_read_users(args.users_file), args.start, args.end, out, args.catalog,
+                      args.format, args.workers, args.seed.encode('utf-8') if args.seed else None,
+                      args.window, args.chunk_size)
+    except Exception as e:
+        print(f"❌ Error exporting fortunes: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"✅ Exported {rows} fortunes", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
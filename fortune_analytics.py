@@ -0,0 +1,210 @@
+"""
+Fortune Analytics
+Category, calendar, streak, gap and reuse rollups over a user's history
+
+NumPy is used for the counting when it is installed; otherwise the same
+results come from pure Python.
+"""
+
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from fortune_stats import UNKNOWN_CATEGORY
+
+# date.toordinal() of 1970-01-01, the datetime64 epoch
+_EPOCH_ORDINAL = 719163
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _iso(ordinal: int) -> str:
+    return date.fromordinal(int(ordinal)).isoformat()
+
+
+class HistoryAnalytics:
+    """Rollups over a history index joined with the catalog.
+
+    ``history`` is a HistoryStore or SQLiteHistory; both expose
+    ``columns()``, which gives one (ordinal, fortune_id) pair per date in
+    date order. The columns and every result are cached until the history
+    length changes, so repeated queries cost nothing and an append
+    invalidates them all.
+    """
+
+    def __init__(self, history, catalog, use_numpy: Optional[bool] = None):
+        self.history = history
+        self.catalog = catalog
+        self.use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        self._stamp = None
+        self._cache: Dict[str, object] = {}
+        self._ordinals = None
+        self._fortune_ids = None
+
+    def invalidate(self):
+        """Drop cached columns and results"""
+        self._stamp = None
+        self._cache.clear()
+        self._ordinals = self._fortune_ids = None
+
+    def _columns(self):
+        stamp = len(self.history)
+        if stamp != self._stamp:
+            self.invalidate()
+            ordinals, fortune_ids = self.history.columns()
+            if self.use_numpy:
+                ordinals = np.asarray(ordinals, dtype=np.int64)
+                fortune_ids = np.asarray(fortune_ids, dtype=np.int64)
+            self._ordinals, self._fortune_ids = ordinals, fortune_ids
+            self._stamp = stamp
+        return self._ordinals, self._fortune_ids
+
+    def _cached(self, name: str, compute):
+        self._columns()
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def _category_of(self, fortune_id: int) -> str:
+        fortune = self.catalog.get(int(fortune_id))
+        return fortune.get("category", UNKNOWN_CATEGORY) if fortune else UNKNOWN_CATEGORY
+
+    def _fortune_counts(self) -> List[Tuple[int, int]]:
+        """(fortune_id, times drawn) for every drawn fortune"""
+        def compute():
+            _, fortune_ids = self._columns()
+            if self.use_numpy:
+                ids, counts = np.unique(fortune_ids, return_counts=True)
+                return list(zip(ids.tolist(), counts.tolist()))
+            return list(Counter(fortune_ids).items())
+        return self._cached("fortune_counts", compute)
+
+    def _runs(self) -> List[Tuple[int, int]]:
+        """(first ordinal, length) of each run of consecutive days"""
+        def compute():
+            ordinals, _ = self._columns()
+            if not len(ordinals):
+                return []
+            if self.use_numpy:
+                starts = np.concatenate(([0], np.flatnonzero(np.diff(ordinals) != 1) + 1))
+                lengths = np.diff(np.concatenate((starts, [len(ordinals)])))
+                return list(zip(ordinals[starts].tolist(), lengths.tolist()))
+            runs = []
+            start = previous = ordinals[0]
+            for ordinal in ordinals[1:]:
+                if ordinal != previous + 1:
+                    runs.append((start, previous - start + 1))
+                    start = ordinal
+                previous = ordinal
+            runs.append((start, previous - start + 1))
+            return runs
+        return self._cached("runs", compute)
+
+    def category_distribution(self) -> Dict[str, int]:
+        """Fortunes per category, most frequent first"""
+        def compute():
+            totals = Counter()
+            for fortune_id, count in self._fortune_counts():
+                totals[self._category_of(fortune_id)] += count
+            return dict(sorted(totals.items(), key=lambda item: (-item[1], item[0])))
+        return self._cached("categories", compute)
+
+    def weekday_histogram(self) -> Dict[str, int]:
+        """Fortunes per weekday, Monday first"""
+        def compute():
+            ordinals, _ = self._columns()
+            if self.use_numpy:
+                # Ordinal 1 (0001-01-01) is a Monday
+                counts = np.bincount((ordinals - 1) % 7, minlength=7).tolist()
+            else:
+                counts = [0] * 7
+                for ordinal in ordinals:
+                    counts[(ordinal - 1) % 7] += 1
+            return dict(zip(WEEKDAYS, counts))
+        return self._cached("weekdays", compute)
+
+    def monthly_counts(self) -> Dict[str, int]:
+        """Fortunes per calendar month ("YYYY-MM"), oldest first"""
+        def compute():
+            ordinals, _ = self._columns()
+            if self.use_numpy:
+                months = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+                keys, counts = np.unique(months, return_counts=True)
+                return {str(k): int(c) for k, c in zip(keys, counts)}
+            counts: Dict[str, int] = {}
+            for ordinal in ordinals:
+                key = _iso(ordinal)[:7]
+                counts[key] = counts.get(key, 0) + 1
+            return counts
+        return self._cached("months", compute)
+
+    def month_histogram(self) -> Dict[int, int]:
+        """Fortunes per month of the year (1-12), across all years"""
+        def compute():
+            counts = {month: 0 for month in range(1, 13)}
+            for key, count in self.monthly_counts().items():
+                counts[int(key[5:7])] += count
+            return counts
+        return self._cached("month_of_year", compute)
+
+    def longest_streak(self) -> Dict:
+        """Longest run of consecutive days ever"""
+        def compute():
+            runs = self._runs()
+            if not runs:
+                return {"length": 0, "start": None, "end": None}
+            start, length = max(runs, key=lambda run: run[1])
+            return {"length": length, "start": _iso(start), "end": _iso(start + length - 1)}
+        return self._cached("longest_streak", compute)
+
+    def gaps(self) -> Dict:
+        """Stretches of missed days between the first and last fortune"""
+        def compute():
+            runs = self._runs()
+            gaps = [(start + length, runs[i + 1][0] - (start + length))
+                    for i, (start, length) in enumerate(runs[:-1])]
+            if not gaps:
+                return {"count": 0, "missed_days": 0, "average": 0.0, "longest": None}
+            missed = sum(days for _, days in gaps)
+            first, days = max(gaps, key=lambda gap: gap[1])
+            return {
+                "count": len(gaps),
+                "missed_days": missed,
+                "average": missed / len(gaps),
+                "longest": {"days": days, "start": _iso(first), "end": _iso(first + days - 1)}
+            }
+        return self._cached("gaps", compute)
+
+    def reuse(self, top: int = 5) -> Dict:
+        """How often fortunes come back, and how much of the catalog was seen"""
+        def compute():
+            counts = self._fortune_counts()
+            total = sum(count for _, count in counts)
+            unique = len(counts)
+            repeated = sorted((item for item in counts if item[1] > 1),
+                              key=lambda item: (-item[1], item[0]))
+            return {
+                "total": total,
+                "unique_fortunes": unique,
+                "reuse_rate": 1 - unique / total if total else 0.0,
+                "catalog_coverage": unique / len(self.catalog) if len(self.catalog) else 0.0,
+                "most_repeated": [{"id": fortune_id, "count": count}
+                                  for fortune_id, count in repeated[:top]]
+            }
+        return self._cached(f"reuse:{top}", compute)
+
+    def summary(self) -> Dict:
+        """Every rollup in one dict"""
+        return {
+            "categories": self.category_distribution(),
+            "weekdays": self.weekday_histogram(),
+            "months": self.month_histogram(),
+            "monthly": self.monthly_counts(),
+            "longest_streak": self.longest_streak(),
+            "gaps": self.gaps(),
+            "reuse": self.reuse()
+        }
@@ -0,0 +1,430 @@
+"""
+Fortune Backup
+Incremental, rotated backups of user data in persistent locations
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from fortune_instrumentation import count_bytes, count_file_read
+from fortune_records import HistoryEntry
+from fortune_storage import DurabilityPolicy, atomic_write_json, dumps_json, json_default, read_json
+
+BACKUP_VERSION = "2.1"
+# 2.0 used the same files with an unchained digest; still restorable, unverified
+INCREMENTAL_VERSIONS = ("2.0", BACKUP_VERSION)
+
+INFO_FILE = "backup_info.json"
+LEGACY_BACKUP_FILE = "user_data_backup.json"
+SNAPSHOT_PREFIX = "user_data_backup_"
+DELTA_PREFIX = "backup_delta_"
+
+
+# Reused because json.dumps builds a new encoder for every call with options
+_CANONICAL = json.JSONEncoder(sort_keys=True, separators=(',', ':'),
+                              ensure_ascii=False, default=json_default)
+
+
+def _canonical(obj) -> bytes:
+    return _CANONICAL.encode(obj).encode('utf-8')
+
+
+def _canonical_entry(entry) -> bytes:
+    if type(entry) is HistoryEntry and not entry.extra:
+        # Same bytes as going through json_default, without the Mapping calls
+        entry = {"date": entry.date, "fortune_id": entry.fortune_id, "timestamp": entry.timestamp}
+    return _CANONICAL.encode(entry).encode('utf-8')
+
+
+# Derived from the history and rebuilt after a restore; kept out of
+# backups and out of the digest
+DERIVED_KEYS = ("stats", "history_digest")
+
+
+class HistoryDigest:
+    """Chained SHA-256 digest of user data.
+
+    The header (everything but the history and DERIVED_KEYS) is hashed
+    first, then each history entry is hashed together with the digest
+    before it. Appending an entry costs one short hash, and a stored
+    digest can be extended without reading the entries it covers. The
+    digests of the last ``KEEP`` prefixes, plus any pinned counts, are
+    kept for comparing with backups taken at those lengths.
+    """
+
+    KEEP = 256
+
+    def __init__(self, count: int, value: bytes):
+        self.count = count
+        self.value = value
+        self._recent = deque([value], maxlen=self.KEEP)
+        self._pinned: Dict[int, bytes] = {}
+
+    @classmethod
+    def of(cls, user_data: Dict, counts=()) -> "HistoryDigest":
+        """Hash ``user_data`` in full, pinning the prefix digests for ``counts``"""
+        header = {k: v for k, v in user_data.items() if k != "history" and k not in DERIVED_KEYS}
+        digest = cls(0, hashlib.sha256(_canonical(header)).digest())
+        history = user_data.get("history", [])
+        start = 0
+        for count in sorted(c for c in counts if 0 <= c < len(history)):
+            digest.extend(history[start:count])
+            digest._pinned[count] = digest.value
+            start = count
+        digest.extend(history[start:])
+        return digest
+
+    @classmethod
+    def load(cls, data, user_data: Dict) -> "HistoryDigest":
+        """Stored digest extended over the entries after it, or a full hash.
+
+        ``data`` must describe a prefix of ``user_data["history"]``.
+        """
+        if isinstance(data, HistoryDigest):
+            data = data.to_dict()
+        history = user_data.get("history", [])
+        try:
+            count = int(data["count"])
+            value = bytes.fromhex(data["sha256"])
+        except (KeyError, TypeError, ValueError):
+            return cls.of(user_data)
+        if not 0 <= count <= len(history) or len(value) != hashlib.sha256().digest_size:
+            return cls.of(user_data)
+        digest = cls(count, value)
+        digest.extend(history[count:])
+        return digest
+
+    def extend(self, entries):
+        """Add entries appended to the history"""
+        value, count = self.value, self.count
+        for entry in entries:
+            value = hashlib.sha256(value + _canonical_entry(entry)).digest()
+            count += 1
+            self._recent.append(value)
+        self.value, self.count = value, count
+
+    def hexdigest(self) -> str:
+        return self.value.hex()
+
+    def prefix(self, count: int) -> Optional[str]:
+        """Digest of the first ``count`` entries, if still known"""
+        if count in self._pinned:
+            return self._pinned[count].hex()
+        index = count - (self.count - len(self._recent) + 1)
+        if 0 <= index < len(self._recent):
+            return self._recent[index].hex()
+        return None
+
+    def copy(self) -> "HistoryDigest":
+        """Snapshot that later ``extend`` calls do not change"""
+        digest = HistoryDigest(self.count, self.value)
+        digest._recent = self._recent.copy()
+        digest._pinned = dict(self._pinned)
+        return digest
+
+    def to_dict(self) -> Dict:
+        return {"count": self.count, "sha256": self.hexdigest()}
+
+
+class BackupManager:
+    """Writes backups to each location only when the data has changed.
+
+    Every location holds a few full snapshots
+    (``user_data_backup_<stamp>.json``), each with a JSON Lines delta of
+    the history entries appended after it
+    (``backup_delta_<stamp>.jsonl``). ``backup_info.json`` records which
+    snapshot is current, how much of its delta is committed and the
+    HistoryDigest of the data it represents. Comparing that with the
+    digest of the same-length prefix of the current data tells "only new
+    entries were appended" (write a delta) apart from "the data changed"
+    (write a new snapshot).
+    """
+
+    KEEP_SNAPSHOTS = 5
+    # Seconds to wait for info files when looking for a backup to restore
+    DISCOVERY_TIMEOUT = 2.0
+    # Start a fresh snapshot once a delta grows past this many entries
+    MAX_DELTA_ENTRIES = 50
+
+    def __init__(self, locations: List[str], policy: Optional[DurabilityPolicy] = None):
+        self.locations = locations
+        self.policy = policy
+        self._state: Dict[str, Optional[Dict]] = {}
+
+    def read_info(self, backup_dir: str) -> Optional[Dict]:
+        """Read a location's backup_info.json, or None"""
+        try:
+            return read_json(os.path.join(backup_dir, INFO_FILE))
+        except (OSError, ValueError):
+            return None
+
+    def _current_state(self, backup_dir: str) -> Optional[Dict]:
+        if backup_dir not in self._state:
+            info = self.read_info(backup_dir)
+            if not info or info.get("version") != BACKUP_VERSION:
+                info = None
+            self._state[backup_dir] = info
+        return self._state[backup_dir]
+
+    def invalidate(self, backup_dir: str):
+        """Rewrite a location with a full snapshot on the next backup (e.g. it failed verify)"""
+        self._state[backup_dir] = None
+
+    def backup(self, user_data: Dict, digest: Optional[HistoryDigest] = None) -> int:
+        """Bring every location up to date; returns how many were written.
+
+        ``digest`` is the caller's running HistoryDigest of ``user_data``;
+        without one the data is hashed in full.
+        """
+        states = {loc: self._current_state(loc) for loc in self.locations}
+        history = user_data.get("history", [])
+        if digest is None or digest.count != len(history):
+            digest = HistoryDigest.of(user_data, {s["history_count"] for s in states.values() if s})
+
+        written = 0
+        for backup_dir, state in states.items():
+            if state and state.get("sha256") == digest.hexdigest():
+                continue
+            try:
+                os.makedirs(backup_dir, exist_ok=True)
+                base = state["history_count"] if state else None
+                appended = (state and base < len(history) and "delta_bytes" in state
+                            and digest.prefix(base) == state.get("sha256")
+                            and state["delta_count"] + len(history) - base <= self.MAX_DELTA_ENTRIES)
+                if not (appended and self._write_delta(backup_dir, state, history[base:],
+                                                       digest.hexdigest(), user_data)):
+                    self._write_snapshot(backup_dir, user_data, digest.hexdigest())
+                written += 1
+            except Exception:
+                # Leave the location to be retried on the next save
+                self._state.pop(backup_dir, None)
+                continue
+        return written
+
+    def _info(self, user_data: Dict, stamp: str, digest: str, delta_count: int,
+              delta_bytes: int) -> Dict:
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "device_id": user_data.get("device_id"),
+            "version": BACKUP_VERSION,
+            "snapshot": f"{SNAPSHOT_PREFIX}{stamp}.json",
+            "delta": f"{DELTA_PREFIX}{stamp}.jsonl",
+            "history_count": len(user_data.get("history", [])),
+            "delta_count": delta_count,
+            "delta_bytes": delta_bytes,
+            "sha256": digest
+        }
+
+    def _write_snapshot(self, backup_dir: str, user_data: Dict, digest: str):
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        info = self._info(user_data, stamp, digest, 0, 0)
+        atomic_write_json(os.path.join(backup_dir, info["snapshot"]), user_data, self.policy)
+        atomic_write_json(os.path.join(backup_dir, INFO_FILE), info, self.policy)
+        self._state[backup_dir] = info
+        self.cleanup(backup_dir)
+
+    def _write_delta(self, backup_dir: str, state: Dict, entries: List[Dict],
+                     digest: str, user_data: Dict) -> bool:
+        """Append entries to the current delta; False if it must be rewritten as a snapshot"""
+        stamp = state["snapshot"][len(SNAPSHOT_PREFIX):-len(".json")]
+        lines = b"".join(dumps_json(entry) + b"\n" for entry in entries)
+        committed = state["delta_bytes"]
+        info = self._info(user_data, stamp, digest, state["delta_count"] + len(entries),
+                          committed + len(lines))
+        with open(os.path.join(backup_dir, info["delta"]), 'ab') as f:
+            if f.seek(0, os.SEEK_END) < committed:
+                return False  # Lost committed lines; start over from a snapshot
+            # Lines past the committed length are left by a save interrupted
+            # before its info file was written; drop them so the new lines
+            # follow the ones restore will read
+            f.truncate(committed)
+            f.write(lines)
+            count_bytes(written=len(lines))
+            if self.policy and self.policy.should_sync():
+                f.flush()
+                os.fsync(f.fileno())
+        # The info file is the commit point
+        atomic_write_json(os.path.join(backup_dir, INFO_FILE), info, self.policy)
+        self._state[backup_dir] = info
+        return True
+
+    def cleanup(self, backup_dir: str):
+        """Keep only the most recent snapshots (and their deltas)"""
+        try:
+            snapshots = sorted(
+                name for name in os.listdir(backup_dir)
+                if name.startswith(SNAPSHOT_PREFIX) and name.endswith(".json")
+            )
+            for name in snapshots[:-self.KEEP_SNAPSHOTS]:
+                stamp = name[len(SNAPSHOT_PREFIX):-len(".json")]
+                for stale in (name, f"{DELTA_PREFIX}{stamp}.jsonl"):
+                    try:
+                        os.remove(os.path.join(backup_dir, stale))
+                    except OSError:
+                        pass
+        except Exception:
+            pass
+
+    def load(self, backup_dir: str, info: Optional[Dict] = None) -> Optional[Dict]:
+        """Load the user data a location's current backup represents"""
+        if info is None:
+            info = self.read_info(backup_dir)
+        if not info:
+            return None
+
+        if info.get("version") not in INCREMENTAL_VERSIONS:
+            # Single-file backups written before incremental backups
+            return read_json(os.path.join(backup_dir, LEGACY_BACKUP_FILE), "history")
+
+        user_data = read_json(os.path.join(backup_dir, info["snapshot"]), "history")
+
+        remaining = info.get("delta_count", 0)
+        if remaining:
+            with open(os.path.join(backup_dir, info["delta"]), 'r', encoding='utf-8') as f:
+                count_file_read(f)
+                for line in f:
+                    if remaining <= 0:
+                        break
+                    user_data["history"].append(json.loads(line))
+                    remaining -= 1
+        return user_data
+
+    def verify(self, user_data: Dict, info: Dict) -> bool:
+        """Whether loaded data matches the digest its info file recorded"""
+        if info.get("version") != BACKUP_VERSION:
+            return True  # Older backups carry no chained digest
+        return HistoryDigest.of(user_data).hexdigest() == info.get("sha256")
+
+    def discover(self, timeout: Optional[float] = None) -> List[Tuple[str, Dict]]:
+        """(location, info) for every readable location, newest first.
+
+        Only the small info files are read, all at once on one thread per
+        location, so the slowest location bounds the wait rather than the
+        sum of them. Locations that have not answered after ``timeout``
+        seconds are skipped. Their reads finish in the background on
+        daemon threads, so a hung mount cannot hold up interpreter exit.
+        """
+        if timeout is None:
+            timeout = self.DISCOVERY_TIMEOUT
+        results = queue.Queue()
+
+        def read(backup_dir):
+            info = None
+            try:
+                info = self.read_info(backup_dir)
+            finally:
+                results.put((backup_dir, info))
+
+        for backup_dir in self.locations:
+            threading.Thread(target=read, args=(backup_dir,), name="backup-discovery",
+                             daemon=True).start()
+        answers = []
+        deadline = time.monotonic() + timeout
+        while len(answers) < len(self.locations):
+            try:
+                answers.append(results.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+
+        found = []
+        for backup_dir, info in answers:
+            # The next backup() can reuse what was just read
+            if backup_dir not in self._state:
+                self._state[backup_dir] = (
+                    info if info and info.get("version") == BACKUP_VERSION else None)
+            if (info and info.get("timestamp")
+                    and (info.get("version") != BACKUP_VERSION or info.get("history_count"))):
+                found.append((backup_dir, info))
+        # Ties go to the earlier (higher priority) location
+        found.sort(key=lambda item: self.locations.index(item[0]))
+        found.sort(key=lambda item: item[1]["timestamp"], reverse=True)
+        return found
+
+    def unmerged(self, user_data: Dict, found: List[Tuple[str, Dict]],
+                 digest: Optional[HistoryDigest] = None) -> List[Tuple[str, Dict]]:
+        """The discovered backups holding anything ``user_data`` lacks.
+
+        A backup whose digest equals the digest of ``user_data`` cut to
+        the same history length is contained in it and is left out
+        without being read. With the caller's running ``digest`` that is
+        a lookup; the data is only hashed when a backup is older than the
+        prefixes it remembers. Older backups have no chained digest and
+        are kept.
+        """
+        counts = {info["history_count"] for _, info in found
+                  if info.get("version") == BACKUP_VERSION}
+        if (digest is None or digest.count != len(user_data.get("history", []))
+                or any(count <= digest.count and digest.prefix(count) is None for count in counts)):
+            digest = HistoryDigest.of(user_data, counts)
+        return [(backup_dir, info) for backup_dir, info in found
+                if info.get("version") != BACKUP_VERSION
+                or digest.prefix(info["history_count"]) != info.get("sha256")]
+
+
+class BackgroundBackupWriter:
+    """Runs BackupManager.backup on a worker thread.
+
+    ``submit`` only records the latest snapshot and returns. Snapshots
+    submitted while a backup is running are coalesced, so only the newest
+    one is written. A snapshot may also be a callable that builds it (or
+    returns None to skip), which then runs on the worker thread.
+    """
+
+    def __init__(self, backups: BackupManager):
+        self.backups = backups
+        self._cond = threading.Condition()
+        self._pending: Optional[Tuple] = None
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="backup-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, user_data: Union[Dict, Callable[[], Optional[Dict]]],
+               digest: Optional[HistoryDigest] = None):
+        """Queue a snapshot (and its digest, if known) for backup, replacing any not yet written"""
+        with self._cond:
+            if self._closed:
+                return
+            self._pending = (user_data, digest)
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued snapshots are written; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush and stop the worker thread"""
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return flushed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                (user_data, digest), self._pending = self._pending, None
+                self._busy = True
+            try:
+                if callable(user_data):
+                    user_data = user_data()
+                if user_data is not None:
+                    self.backups.backup(user_data, digest)
+            except Exception as e:
+                print(f"Error writing backup: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
@@ -0,0 +1,330 @@
+"""
+Fortune Catalog
+Indexed, read-only views of the fortune database (JSON or compiled)
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from fortune_records import Fortune
+
+
+class FortuneCatalog:
+    """Immutable fortune list with id and category indexes.
+
+    Behaves like the plain list of fortune dicts it replaces (iteration,
+    ``len`` and positional indexing), and adds O(1) lookups by id.
+    Fortunes are held as compact ``Fortune`` records. A repeated id is
+    reported and skipped, or raises ValueError when ``strict``.
+    """
+
+    def __init__(self, fortunes: Iterable[Dict], strict: bool = False):
+        self._fortunes: List[Fortune] = []
+        self._by_id: Dict[int, Fortune] = {}
+        self._by_category: Dict[str, List[int]] = {}
+        # Ids that appeared more than once; only the first occurrence is kept
+        self.duplicates: List[int] = []
+
+        for fortune in map(Fortune.from_mapping, fortunes):
+            fortune_id = fortune["id"]
+            if fortune_id in self._by_id:
+                self.duplicates.append(fortune_id)
+                continue
+            self._fortunes.append(fortune)
+            self._by_id[fortune_id] = fortune
+            self._by_category.setdefault(fortune.category, []).append(fortune_id)
+
+        if self.duplicates:
+            shown = ", ".join(str(i) for i in self.duplicates[:10])
+            more = f" (+{len(self.duplicates) - 10} more)" if len(self.duplicates) > 10 else ""
+            message = f"Duplicate fortune ids in catalog: {shown}{more}"
+            if strict:
+                raise ValueError(message)
+            print(f"Warning: {message}; keeping the first of each")
+
+    def __len__(self) -> int:
+        return len(self._fortunes)
+
+    def __iter__(self) -> Iterator[Fortune]:
+        return iter(self._fortunes)
+
+    def __getitem__(self, index):
+        return self._fortunes[index]
+
+    def __contains__(self, fortune_id) -> bool:
+        return fortune_id in self._by_id
+
+    def get(self, fortune_id) -> Optional[Fortune]:
+        """Return the fortune with the given id, or None"""
+        return self._by_id.get(fortune_id)
+
+    def categories(self) -> List[str]:
+        """List of categories present in the catalog"""
+        return list(self._by_category)
+
+    def ids_in_category(self, category: str) -> List[int]:
+        """Fortune ids belonging to a category (catalog order)"""
+        return list(self._by_category.get(category, ()))
+
+
+# Compiled catalog layout (little-endian, sections 8-byte aligned):
+#   header      magic, count, category count, section offsets
+#   records     count x (id int64, category uint32, text length uint32, text offset uint64)
+#   id index    count x int64 ids sorted ascending, then count x uint32 record slots
+#   categories  uint32 length + UTF-8 name, repeated
+#   text blob   UTF-8 fortune texts back to back
+CATALOG_MAGIC = b"DFCAT\x00\x01\x00"
+_HEADER = struct.Struct("<8sIIQQQ")
+_RECORD = struct.Struct("<qIIQ")
+_ID = struct.Struct("<q")
+_SLOT = struct.Struct("<I")
+_LENGTH = struct.Struct("<I")
+
+
+def _align8(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def compile_catalog(fortunes: Iterable[Dict], path: str) -> int:
+    """Write fortunes in the compiled catalog format; returns the count"""
+    catalog = FortuneCatalog(fortunes, strict=True)  # refuse duplicate ids
+    categories = catalog.categories()
+    category_codes = {name: code for code, name in enumerate(categories)}
+
+    records = bytearray()
+    blob = bytearray()
+    for fortune in catalog:
+        text = fortune.text.encode('utf-8')
+        records += _RECORD.pack(fortune.id, category_codes[fortune.category],
+                                len(text), len(blob))
+        blob += text
+
+    order = sorted(range(len(catalog)), key=lambda slot: catalog[slot].id)
+    index = bytearray()
+    for slot in order:
+        index += _ID.pack(catalog[slot].id)
+    for slot in order:
+        index += _SLOT.pack(slot)
+
+    category_table = bytearray()
+    for name in categories:
+        encoded = name.encode('utf-8')
+        category_table += _LENGTH.pack(len(encoded)) + encoded
+
+    records_offset = _HEADER.size
+    index_offset = _align8(records_offset + len(records))
+    categories_offset = _align8(index_offset + len(index))
+    blob_offset = _align8(categories_offset + len(category_table))
+
+    # Write beside and rename: running processes may have the old file
+    # mapped, and truncating it under them would fault their reads
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(CATALOG_MAGIC, len(catalog), len(categories),
+                             index_offset, categories_offset, blob_offset))
+        for offset, section in ((records_offset, records), (index_offset, index),
+                                (categories_offset, category_table), (blob_offset, blob)):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(section)
+    os.replace(temp_path, path)
+    return len(catalog)
+
+
+class _IdColumn:
+    """Sorted id column of a compiled catalog, indexable for bisect"""
+
+    def __init__(self, buffer, offset: int, count: int):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        return _ID.unpack_from(self._buffer, self._offset + index * _ID.size)[0]
+
+
+class CompiledCatalog:
+    """Memory-mapped compiled catalog with the FortuneCatalog interface.
+
+    Opening only maps the file and reads the header; fortunes are
+    decoded from the mapping when they are accessed.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, self._count, category_count, self._index_offset,
+         categories_offset, self._blob_offset) = _HEADER.unpack_from(self._map, 0)
+        if magic != CATALOG_MAGIC:
+            self._map.close()
+            raise ValueError(f"Not a compiled fortune catalog: {path}")
+
+        self._categories: List[str] = []
+        offset = categories_offset
+        for _ in range(category_count):
+            (length,) = _LENGTH.unpack_from(self._map, offset)
+            offset += _LENGTH.size
+            self._categories.append(self._map[offset:offset + length].decode('utf-8'))
+            offset += length
+
+        self._ids = _IdColumn(self._map, self._index_offset, self._count)
+        self._slots_offset = self._index_offset + self._count * _ID.size
+        self._by_category: Optional[Dict[str, List[int]]] = None
+
+    def _record(self, slot: int) -> Fortune:
+        fortune_id, category, length, text_offset = _RECORD.unpack_from(
+            self._map, _HEADER.size + slot * _RECORD.size)
+        start = self._blob_offset + text_offset
+        return Fortune(fortune_id, self._map[start:start + length].decode('utf-8'),
+                       self._categories[category])
+
+    def _slot_for(self, fortune_id) -> Optional[int]:
+        if not isinstance(fortune_id, int):
+            return None
+        index = bisect.bisect_left(self._ids, fortune_id)
+        if index < self._count and self._ids[index] == fortune_id:
+            return _SLOT.unpack_from(self._map, self._slots_offset + index * _SLOT.size)[0]
+        return None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Fortune]:
+        for slot in range(self._count):
+            yield self._record(slot)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(slot) for slot in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("catalog index out of range")
+        return self._record(index)
+
+    def __contains__(self, fortune_id) -> bool:
+        return self._slot_for(fortune_id) is not None
+
+    def get(self, fortune_id) -> Optional[Fortune]:
+        """Return the fortune with the given id, or None"""
+        slot = self._slot_for(fortune_id)
+        return None if slot is None else self._record(slot)
+
+    def categories(self) -> List[str]:
+        """List of categories present in the catalog"""
+        return list(self._categories)
+
+    def ids_in_category(self, category: str) -> List[int]:
+        """Fortune ids belonging to a category (catalog order)"""
+        if self._by_category is None:
+            by_category: Dict[str, List[int]] = {name: [] for name in self._categories}
+            for fortune_id, code, _, _ in _RECORD.iter_unpack(
+                    self._map[_HEADER.size:_HEADER.size + self._count * _RECORD.size]):
+                by_category[self._categories[code]].append(fortune_id)
+            self._by_category = by_category
+        return list(self._by_category.get(category, ()))
+
+
+def load_catalog(path: str):
+    """Open a catalog file, compiled (.bin) or JSON"""
+    if path.endswith(".bin"):
+        return CompiledCatalog(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return FortuneCatalog(json.load(f))
+
+
+# Shown for history entries whose fortune is no longer in the catalog
+MISSING_FORTUNE_TEXT = "（此籤餅已從籤餅庫移除）"
+MISSING_FORTUNE_CATEGORY = "unknown"
+
+
+def missing_fortune(fortune_id) -> Fortune:
+    """Placeholder for an id the current catalog does not contain"""
+    return Fortune(fortune_id, MISSING_FORTUNE_TEXT, MISSING_FORTUNE_CATEGORY,
+                   extra={"missing": True})
+
+
+class CatalogSnapshot:
+    """One immutable catalog version.
+
+    Readers should take a snapshot once and use its ``catalog`` for the
+    whole operation; a reload installs a new snapshot and never changes
+    an existing one.
+    """
+
+    __slots__ = ("version", "catalog", "source")
+
+    def __init__(self, version: int, catalog, source: Optional[str]):
+        self.version = version
+        self.catalog = catalog
+        self.source = source
+
+    def get(self, fortune_id) -> Fortune:
+        """The fortune with this id, or a placeholder if it was removed"""
+        return self.catalog.get(fortune_id) or missing_fortune(fortune_id)
+
+
+class CatalogWatcher:
+    """Polls catalog files and reloads them off the caller's thread.
+
+    Each ``interval`` the (mtime, size) of every path is compared with the
+    last seen values. A change must hold for one more poll before
+    ``load`` runs, so a file caught mid-write is not parsed. ``load``
+    runs on the watcher thread and its result is passed to ``on_reload``.
+    A failing load is reported and retried on the next change.
+    """
+
+    def __init__(self, paths: List[str], load, on_reload, interval: float = 2.0):
+        self.paths = paths
+        self.load = load
+        self.on_reload = on_reload
+        self.interval = interval
+        self._seen = self._stamp()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+
+    def _stamp(self):
+        stamps = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def start(self):
+        self._thread.start()
+
+    def check(self) -> bool:
+        """Reload if the files changed and have settled; returns True on reload"""
+        stamp = self._stamp()
+        if stamp == self._seen:
+            return False
+        if self._stop.wait(self.interval) or self._stamp() != stamp:
+            return False  # Stopped, or still being written: look again next poll
+        self._seen = stamp
+        try:
+            catalog = self.load()
+        except Exception as e:
+            print(f"Error reloading fortunes: {e}")
+            return False
+        self.on_reload(catalog)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
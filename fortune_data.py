@@ -5,43 +5,322 @@ Handles fortune storage, user history, and daily limit logic
 
 import json
 import os
-import random
-import shutil
 from datetime import datetime, date
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from fortune_analytics import HistoryAnalytics
+from fortune_backup import DERIVED_KEYS, BackgroundBackupWriter, BackupManager, HistoryDigest
+from fortune_catalog import CatalogSnapshot, CatalogWatcher, CompiledCatalog, FortuneCatalog
+from fortune_history import HistoryStore
+from fortune_instrumentation import count_file_read
+from fortune_merge import HistoryMerge
+from fortune_records import HistoryEntry
+from fortune_search import SearchIndex, file_digest
+from fortune_selection import DeterministicSelector, FortuneSelector
+from fortune_sqlite import SQLiteHistory, SQLiteStore
+from fortune_stats import UNKNOWN_CATEGORY, StatsAggregate
+from fortune_storage import DurabilityPolicy, HistoryJournal, atomic_write_json, read_json
 
 class FortuneManager:
-    def __init__(self):
+    # Fold the journal into user_data.json after this many appended entries
+    JOURNAL_COMPACT_EVERY = 100
+    # History owner in the SQLite database for this single-user app
+    SQLITE_USER_ID = "local"
+
+    def __init__(self, durability: Optional[DurabilityPolicy] = None, lazy: bool = False,
+                 repeat_window: int = 30, storage: Optional[str] = None,
+                 seed: Optional[str] = None, watch_catalog: Optional[bool] = None):
         self.app_dir = os.path.expanduser("~/.dailyfortune")
         os.makedirs(self.app_dir, exist_ok=True)
         
         # Handle both development and PyInstaller bundle
         import sys
-        if getattr(sys, 'frozen', False):
+        self.frozen = getattr(sys, 'frozen', False)
+        if self.frozen:
             # Running as PyInstaller bundle
             bundle_dir = sys._MEIPASS
             self.fortunes_file = os.path.join(bundle_dir, "fortunes.json")
         else:
             # Running as script
             self.fortunes_file = os.path.join(os.path.dirname(__file__), "fortunes.json")
+        self.compiled_fortunes_file = os.path.splitext(self.fortunes_file)[0] + ".bin"
         self.user_data_file = os.path.join(self.app_dir, "user_data.json")
+        self.search_index_file = os.path.join(self.app_dir, "search_index.cache")
+        # Snapshot, journal and backups each count their own batched writes
+        self.durability = durability or DurabilityPolicy.from_env()
+        self.journal = HistoryJournal(os.path.join(self.app_dir, "user_data.journal"),
+                                      self.durability.copy())
+        self.backups = BackupManager(self._get_backup_locations(), self.durability.copy())
+        self.backup_writer = BackgroundBackupWriter(self.backups)
+        
+        # "json" keeps user_data.json plus journal; "sqlite" keeps history
+        # in fortunes.db and answers queries there
+        self.storage = (storage or os.environ.get("DAILYFORTUNE_STORAGE", "json")).lower()
+        if self.storage not in ("json", "sqlite"):
+            raise ValueError(f"Unknown storage backend: {self.storage}")
+        self.sql = None
+        self._sql_catalog_synced = False
+        self._sql_device_id = None
+        if self.storage == "sqlite":
+            self.sql = SQLiteStore(os.path.join(self.app_dir, "fortunes.db"))
+        
+        # Loaded on first use when lazy, so callers can show UI first
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._user_data = None
+        # Set when a damaged user_data.json was moved aside on load
+        self._user_data_set_aside = False
+        self._history = None
+        self._selector = None
+        self._stats = None
+        self._digest = None
+        self._analytics = None
+        self._search_index = None
+        # Number of most recent fortunes that may not be drawn again
+        self.repeat_window = repeat_window
+        # With a seed, today's fortune is a function of device and date
+        # rather than a random draw (see DeterministicSelector)
+        self.seed = seed or os.environ.get("DAILYFORTUNE_SEED") or None
+        self._deterministic = None
+        
+        # Poll the catalog files and swap in new versions while running
+        self.catalog_watcher = None
+        if watch_catalog is None:
+            watch_catalog = os.environ.get("DAILYFORTUNE_WATCH_CATALOG", "") not in ("", "0")
+        if watch_catalog:
+            self.start_catalog_watch()
+        
+        if not lazy:
+            self.preload()
+    
+    @property
+    def catalog_snapshot(self) -> CatalogSnapshot:
+        """The current catalog version; hold on to it for a consistent read"""
+        if self._snapshot is None:
+            self._snapshot = CatalogSnapshot(1, *self._load_fortunes())
+        return self._snapshot
+    
+    @property
+    def fortunes(self) -> FortuneCatalog:
+        return self.catalog_snapshot.catalog
+    
+    @fortunes.setter
+    def fortunes(self, value: FortuneCatalog):
+        self._install_catalog(value, None)
+    
+    def _install_catalog(self, catalog, source: Optional[str]):
+        """Publish a new catalog version with one reference assignment.
+        
+        Caches built from the catalog (selector, search index, analytics)
+        check which catalog they hold and rebuild on next use.
+        """
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._snapshot = CatalogSnapshot(version, catalog, source)
+        self._sql_catalog_synced = False
+    
+    def reload_fortunes(self) -> CatalogSnapshot:
+        """Read the catalog files again and install them as a new version"""
+        self._install_catalog(*self._read_catalog())
+        return self._snapshot
+    
+    def start_catalog_watch(self, interval: float = 2.0):
+        """Reload the catalog in the background whenever its files change"""
+        if self.catalog_watcher is None:
+            self.catalog_watcher = CatalogWatcher(
+                [self.fortunes_file, self.compiled_fortunes_file],
+                self._read_catalog, lambda loaded: self._install_catalog(*loaded), interval)
+            self.catalog_watcher.start()
+    
+    @property
+    def user_data(self) -> Dict:
+        self._ensure_user_state()
+        if self.sql is not None:
+            # Exported on demand; the SQLite backend never holds history in memory
+            return self.sql.load(self.SQLITE_USER_ID) or {"history": []}
+        return self._user_data
+    
+    @user_data.setter
+    def user_data(self, value: Dict):
+        if self.sql is not None:
+            self.sql.replace_user(self.SQLITE_USER_ID, value)
+            self._selector = None
+            self._sql_device_id = None
+            return
+        self._user_data = value
+        self._stats = None
+        self._digest = None
+    
+    @property
+    def device_id(self) -> str:
+        """This device's id; read from the users row rather than an export with SQLite"""
+        if self.sql is None:
+            return self.user_data.get("device_id", self.SQLITE_USER_ID)
+        if self._sql_device_id is None:
+            self._ensure_user_state()
+            header = self.sql.header(self.SQLITE_USER_ID) or {}
+            self._sql_device_id = header.get("device_id", self.SQLITE_USER_ID)
+        return self._sql_device_id
+    
+    @property
+    def history(self) -> HistoryStore:
+        self._ensure_user_state()
+        return self._history
+    
+    @history.setter
+    def history(self, value: HistoryStore):
+        self._history = value
+        self._selector = None
+        self._stats = None
+        self._digest = None
+        self._analytics = None
+    
+    @property
+    def selector(self) -> FortuneSelector:
+        catalog = self.fortunes
+        if self._selector is None or self._selector.catalog is not catalog:
+            selector = FortuneSelector(catalog, self.repeat_window)
+            selector.load(entry["fortune_id"] for entry in self.history.recent(self.repeat_window))
+            self._selector = selector
+        return self._selector
+    
+    @property
+    def stats(self) -> StatsAggregate:
+        """Running stats, kept in user_data["stats"] (JSON storage only)"""
+        if self._stats is None:
+            user_data = self.user_data
+            self._stats = StatsAggregate.load(user_data.get("stats"), self.history,
+                                              self._category_of)
+            user_data["stats"] = self._stats
+        return self._stats
+    
+    @property
+    def digest(self) -> HistoryDigest:
+        """Running digest of the data, kept in user_data["history_digest"] (JSON storage only)"""
+        if self._digest is None:
+            user_data = self.user_data
+            self._digest = HistoryDigest.load(user_data.get("history_digest"), user_data)
+            user_data["history_digest"] = self._digest
+        return self._digest
+    
+    @property
+    def analytics(self) -> HistoryAnalytics:
+        """Cached rollups over the history; refreshed when it grows"""
+        catalog = self.fortunes
+        if self._analytics is None or self._analytics.catalog is not catalog:
+            self._analytics = HistoryAnalytics(self.history, catalog)
+        return self._analytics
+    
+    @property
+    def search_index(self) -> SearchIndex:
+        """Inverted index over the catalog, cached on disk by catalog file hash"""
+        snapshot = self.catalog_snapshot
+        if self._search_index is None or self._search_index.catalog is not snapshot.catalog:
+            if snapshot.source is None:
+                self._search_index = SearchIndex.build(snapshot.catalog)
+            else:
+                self._search_index = SearchIndex.load_or_build(
+                    snapshot.catalog, self.search_index_file, file_digest(snapshot.source))
+        return self._search_index
+    
+    def _category_of(self, fortune_id: int) -> str:
+        fortune = self.fortunes.get(fortune_id)
+        return fortune.get("category", UNKNOWN_CATEGORY) if fortune else UNKNOWN_CATEGORY
+    
+    @property
+    def deterministic(self) -> Optional[DeterministicSelector]:
+        if self.seed and (self._deterministic is None
+                          or self._deterministic.catalog is not self.fortunes):
+            self._deterministic = DeterministicSelector(self.fortunes, self.seed.encode('utf-8'))
+        return self._deterministic
+    
+    def preload(self):
+        """Load the catalog and user data now instead of on first use"""
+        self.catalog_snapshot
+        self._ensure_user_state()
+    
+    def _ensure_user_state(self):
+        if self._history is None:
+            self._load_user_state()
+    
+    def _load_user_state(self):
+        """Load user data, restore from backup if needed and compact the journal"""
+        if self.sql is not None:
+            if self.sql.get_meta("migrated_at") is None:
+                self._migrate_to_sqlite()
+            self._history = SQLiteHistory(self.sql, self.SQLITE_USER_ID)
+            return
         
-        self.fortunes = self._load_fortunes()
-        self.user_data = self._load_user_data()
+        self._user_data = self._load_user_data()
+        self._history = HistoryStore(self._user_data["history"])
+        digest_stored = "history_digest" in self._user_data
         
         self._try_restore_from_backup()
+        
+        # A set-aside file is replaced with what was recovered from it right
+        # away; files from before the stored digest are rewritten once with it
+        if (self._user_data_set_aside or self.journal.count >= self.JOURNAL_COMPACT_EVERY
+                or (not digest_stored and self._user_data["history"])):
+            self._save_user_data()
+            self._user_data_set_aside = False
+    
+    def _migrate_to_sqlite(self):
+        """One-shot import of user_data.json, its journal and every backup into SQLite"""
+        user_data = self._load_user_data()
+        merge, _, _ = self._merge_backups(user_data, self.backups.discover())
+        
+        header = {k: v for k, v in user_data.items() if k != "history" and k not in DERIVED_KEYS}
+        self.sql.save(self.SQLITE_USER_ID, {**header, "history": []})
+        imported = self.sql.add_entries(self.SQLITE_USER_ID, merge.entries())
+        self.sql.set_meta("migrated_at", datetime.now().isoformat())
+        
+        if imported:
+            print(f"Migrated {imported} history entries to SQLite")
+    
+    def _sync_sql_catalog(self):
+        """Mirror the catalog into SQLite once per process, if its files changed"""
+        if self._sql_catalog_synced:
+            return
+        version = []
+        for path in (self.fortunes_file, self.compiled_fortunes_file):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                version.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+        self.sql.sync_catalog(self.fortunes, "|".join(version) or "default")
+        self._sql_catalog_synced = True
+    
+    def _read_catalog(self) -> Tuple[FortuneCatalog, str]:
+        """Read the catalog files, preferring a current fortunes.bin; raises if unreadable"""
+        if self._compiled_fortunes_current():
+            try:
+                return CompiledCatalog(self.compiled_fortunes_file), self.compiled_fortunes_file
+            except Exception as e:
+                if not os.path.exists(self.fortunes_file):
+                    raise
+                print(f"Error loading compiled fortunes: {e}")
+        
+        with open(self.fortunes_file, 'r', encoding='utf-8') as f:
+            count_file_read(f)
+            return FortuneCatalog(json.load(f)), self.fortunes_file
     
-    def _load_fortunes(self) -> List[Dict]:
-        """Load fortune database"""
+    def _load_fortunes(self) -> Tuple[FortuneCatalog, Optional[str]]:
+        """Load fortune database, and the file it came from"""
         try:
-            if os.path.exists(self.fortunes_file):
-                with open(self.fortunes_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            return self._read_catalog()
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"Error loading fortunes: {e}")
         
         # Default fortunes if file doesn't exist
-        return self._create_default_fortunes()
+        return FortuneCatalog(self._create_default_fortunes()), None
+    
+    def _compiled_fortunes_current(self) -> bool:
+        """Whether fortunes.bin exists and is not older than fortunes.json"""
+        if not os.path.exists(self.compiled_fortunes_file):
+            return False
+        # Bundled files carry extraction mtimes, so trust the build there
+        if self.frozen or not os.path.exists(self.fortunes_file):
+            return True
+        return os.path.getmtime(self.compiled_fortunes_file) >= os.path.getmtime(self.fortunes_file)
     
     def _create_default_fortunes(self) -> List[Dict]:
         """Create default fortune set"""
@@ -59,18 +338,83 @@ class FortuneManager:
         ]
     
     def _load_user_data(self) -> Dict:
-        """Load user history and data"""
+        """Load user history and data (snapshot plus journal tail).
+        
+        Malformed history entries are skipped one by one. If anything in
+        user_data.json could not be read, the file is moved aside before
+        it can be overwritten, so nothing in it is lost for good.
+        """
+        user_data = None
+        skipped = 0
+        damaged = False
+        
+        def parse(entry):
+            nonlocal skipped
+            entry = self._parse_history_entry(entry)
+            skipped += entry is None
+            return entry
+        
         try:
             if os.path.exists(self.user_data_file):
-                with open(self.user_data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                user_data = read_json(self.user_data_file, "history", parse)
+                if not isinstance(user_data, dict) or not isinstance(user_data.get("history"), list):
+                    raise ValueError("expected an object with a history list")
         except Exception as e:
             print(f"Error loading user data: {e}")
+            user_data = None
+            damaged = True
         
-        return {
-            "device_id": self._generate_device_id(),
-            "history": []
-        }
+        if skipped:
+            print(f"Skipped {skipped} malformed history entries in user data")
+            damaged = True
+        self._user_data_set_aside = damaged and self._set_aside_user_data()
+        if self._user_data_set_aside and user_data is not None:
+            # Whatever it covered, it no longer describes this history
+            user_data.pop("history_digest", None)
+        
+        if user_data is None:
+            user_data = {
+                "device_id": self._generate_device_id(),
+                "history": []
+            }
+        elif (isinstance(user_data.get("history_digest"), dict)
+                and user_data["history_digest"].get("count") != len(user_data["history"])):
+            # Only valid for exactly the history it was saved with
+            del user_data["history_digest"]
+        
+        # Replay entries appended since the last snapshot. A crash between
+        # compaction and journal reset can leave entries in both places.
+        try:
+            known_dates = {entry["date"] for entry in user_data["history"]}
+            for entry in self.journal.load():
+                entry = self._parse_history_entry(entry)
+                if entry is not None and entry["date"] not in known_dates:
+                    user_data["history"].append(entry)
+                    known_dates.add(entry["date"])
+        except Exception as e:
+            print(f"Error loading history journal: {e}")
+        
+        return user_data
+    
+    @staticmethod
+    def _parse_history_entry(data) -> Optional[HistoryEntry]:
+        """A history record, or None if ``data`` lacks a field"""
+        try:
+            return HistoryEntry.from_mapping(data)
+        except (KeyError, TypeError, AttributeError):
+            return None
+    
+    def _set_aside_user_data(self) -> bool:
+        """Move a damaged user_data.json out of the way of the next save"""
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        target = f"{self.user_data_file}.damaged-{stamp}"
+        try:
+            os.replace(self.user_data_file, target)
+        except OSError as e:
+            print(f"Error moving aside user data: {e}")
+            return False
+        print(f"Moved unreadable user data to {target}")
+        return True
     
     def _generate_device_id(self) -> str:
         """Generate unique device identifier"""
@@ -81,37 +425,62 @@ class FortuneManager:
         return hashlib.md5(system_info.encode()).hexdigest()[:16]
     
     def _save_user_data(self):
-        """Save user data to file"""
+        """Save full user data snapshot to file and compact the journal"""
+        if self.sql is not None:
+            # Every entry is already committed to SQLite
+            self._create_backup()
+            return
+        
         try:
-            with open(self.user_data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.user_data, f, indent=2, default=str)
+            # Saved alongside, so the next start extends it instead of rehashing
+            self.digest
+            atomic_write_json(self.user_data_file, self.user_data, self.durability)
+            self.journal.reset()
             self._create_backup()
         except Exception as e:
             print(f"Error saving user data: {e}")
     
-    def can_generate_fortune(self) -> bool:
-        """Check if user can get fortune today"""
-        today_str = date.today().isoformat()
+    def _append_history_entry(self, entry: Dict):
+        """Persist a single new history entry via the journal"""
+        if self.sql is not None:
+            # history.append already committed it
+            self._create_backup()
+            return
         
-        for entry in self.user_data["history"]:
-            if entry["date"] == today_str:
-                return False
+        if (self.journal.count + 1 >= self.JOURNAL_COMPACT_EVERY
+                or not os.path.exists(self.user_data_file)):
+            self._save_user_data()
+            return
         
-        return True
+        try:
+            self.journal.append(entry)
+        except Exception as e:
+            print(f"Error appending to history journal: {e}")
+            self._save_user_data()
+            return
+        
+        # Unchanged locations are skipped and the rest get a small delta
+        self._create_backup()
+    
+    def can_generate_fortune(self) -> bool:
+        """Check if user can get fortune today"""
+        return date.today().isoformat() not in self.history
     
     def get_todays_fortune(self) -> Optional[Dict]:
         """Get today's fortune if already generated"""
-        today_str = date.today().isoformat()
-        
-        for entry in self.user_data["history"]:
-            if entry["date"] == today_str:
-                # Find fortune by ID
-                for fortune in self.fortunes:
-                    if fortune["id"] == entry["fortune_id"]:
-                        return {
-                            **fortune,
-                            "generated_at": entry["timestamp"]
-                        }
+        if self.sql is not None:
+            fortune = self.get_fortune_by_date(date.today().isoformat())
+            if fortune:
+                del fortune["date"]
+            return fortune
+        
+        entry = self.history.get(date.today().isoformat())
+        if entry:
+            # Ids removed from the catalog by a reload get a placeholder
+            return {
+                **self.catalog_snapshot.get(entry["fortune_id"]),
+                "generated_at": entry["timestamp"]
+            }
         
         return None
     
@@ -120,29 +489,28 @@ class FortuneManager:
         if not self.can_generate_fortune():
             raise ValueError("Fortune already generated for today")
         
-        # Get recently used fortune IDs to avoid repeats
-        recent_ids = set()
-        recent_count = min(len(self.user_data["history"]), 30)  # Last 30 days
-        for entry in self.user_data["history"][-recent_count:]:
-            recent_ids.add(entry["fortune_id"])
-        
-        # Filter available fortunes
-        available_fortunes = [f for f in self.fortunes if f["id"] not in recent_ids]
-        if not available_fortunes:
-            available_fortunes = self.fortunes  # Use all if all recent
-        
-        # Select random fortune
-        selected_fortune = random.choice(available_fortunes)
+        if self.deterministic is not None:
+            selected_fortune = self.deterministic.fortune_for(self.device_id, date.today())
+        else:
+            # Select random fortune, avoiding the last repeat_window fortunes
+            selected_fortune = self.selector.draw()
         
         # Record in history
-        history_entry = {
-            "date": date.today().isoformat(),
-            "fortune_id": selected_fortune["id"],
-            "timestamp": datetime.now().isoformat()
-        }
+        history_entry = HistoryEntry(
+            date=date.today().isoformat(),
+            fortune_id=selected_fortune["id"],
+            timestamp=datetime.now().isoformat()
+        )
         
-        self.user_data["history"].append(history_entry)
-        self._save_user_data()
+        self.history.append(history_entry)
+        if self._digest is not None:
+            self._digest.extend([history_entry])
+        self.selector.record(history_entry.fortune_id)
+        if self._stats is not None and not self._stats.add(
+                date.today().toordinal(), selected_fortune.get("category", UNKNOWN_CATEGORY)):
+            # Out of order (e.g. the clock went back): rebuild on next use
+            self._stats = None
+        self._append_history_entry(history_entry)
         
         return {
             **selected_fortune,
@@ -151,54 +519,60 @@ class FortuneManager:
     
     def get_stats(self) -> Dict:
         """Get user statistics"""
-        history = self.user_data["history"]
+        if self.sql is not None:
+            self._ensure_user_state()
+            self._sync_sql_catalog()
+            return self.sql.stats(self.SQLITE_USER_ID, date.today())
         
-        if not history:
-            return {
-                "total_fortunes": 0,
-                "streak": 0,
-                "first_fortune": None,
-                "last_fortune": None
-            }
-        
-        # Calculate consecutive days streak
-        streak = 0
-        check_date = date.today()
-        
-        for entry in reversed(history):
-            entry_date = datetime.fromisoformat(entry["date"]).date()
-            if entry_date == check_date:
-                streak += 1
-                check_date = date.fromordinal(check_date.toordinal() - 1)
-            else:
-                break
+        return self.stats.summary(date.today())
+    
+    def get_analytics(self) -> Dict:
+        """Category, weekday/month, streak, gap and reuse rollups"""
+        return self.analytics.summary()
+    
+    def search_fortunes(self, query: str, category: Optional[str] = None, limit: int = 50,
+                        prefix: bool = False) -> List[Dict]:
+        """Fortunes whose text contains every term of ``query`` (catalog order).
         
-        return {
-            "total_fortunes": len(history),
-            "streak": streak,
-            "first_fortune": history[0]["date"],
-            "last_fortune": history[-1]["date"]
-        }
+        A trailing ``*`` or ``prefix=True`` makes the last term a prefix;
+        an empty query with a category lists that category.
+        """
+        return [dict(fortune) for fortune in
+                self.search_index.search(query, category, limit, prefix)]
     
     def get_fortune_by_date(self, target_date: str) -> Optional[Dict]:
         """Get fortune for a specific date (YYYY-MM-DD format)"""
-        for entry in self.user_data["history"]:
-            if entry["date"] == target_date:
-                # Find the corresponding fortune
-                for fortune in self.fortunes:
-                    if fortune["id"] == entry["fortune_id"]:
-                        return {
-                            **fortune,
-                            "generated_at": entry["timestamp"],
-                            "date": entry["date"]
-                        }
+        if self.sql is not None:
+            self._ensure_user_state()
+            self._sync_sql_catalog()
+            return self.sql.fortune_by_date(self.SQLITE_USER_ID, target_date)
+        
+        entry = self.history.get(target_date)
+        if entry:
+            return {
+                **self.catalog_snapshot.get(entry["fortune_id"]),
+                "generated_at": entry["timestamp"],
+                "date": entry["date"]
+            }
         return None
     
     def get_available_dates(self) -> List[str]:
         """Get list of dates with generated fortunes (sorted newest first)"""
-        dates = [entry["date"] for entry in self.user_data["history"]]
-        return sorted(dates, reverse=True)
+        return self.history.dates(reverse=True)
+
+    def get_dates_between(self, start_date: str, end_date: str) -> List[str]:
+        """Get dates with fortunes within [start_date, end_date] (sorted oldest first)"""
+        return self.history.dates_between(start_date, end_date)
     
+    def count_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> int:
+        """Number of dates with fortunes within [start_date, end_date] (either may be None)"""
+        return self.history.count_between(start_date, end_date)
+    
+    def get_dates_page(self, offset: int, limit: int, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None) -> List[str]:
+        """One page of dates with fortunes (sorted newest first), optionally within a range"""
+        return self.history.dates_page(offset, limit, start_date, end_date)
+
     def _get_backup_locations(self) -> List[str]:
         """Get list of backup locations in priority order"""
         home_dir = os.path.expanduser("~")
@@ -214,96 +588,110 @@ class FortuneManager:
     
     def _create_backup(self):
         """Create backup of user data in persistent locations"""
-        if not self.user_data.get("history"):
+        if self.sql is not None:
+            # Exporting the history is O(n); leave it to the writer thread
+            self.backup_writer.submit(self._export_sql_backup)
             return
         
-        backup_data = {
-            "user_data": self.user_data,
-            "backup_info": {
-                "timestamp": datetime.now().isoformat(),
-                "device_id": self.user_data.get("device_id"),
-                "version": "1.0"
-            }
-        }
+        user_data = self.user_data
+        if not user_data.get("history"):
+            return
         
-        for backup_dir in self._get_backup_locations():
-            try:
-                os.makedirs(backup_dir, exist_ok=True)
-                
-                backup_file = os.path.join(backup_dir, "user_data_backup.json")
-                info_file = os.path.join(backup_dir, "backup_info.json")
-                
-                with open(backup_file, 'w', encoding='utf-8') as f:
-                    json.dump(backup_data["user_data"], f, indent=2, default=str)
-                
-                with open(info_file, 'w', encoding='utf-8') as f:
-                    json.dump(backup_data["backup_info"], f, indent=2, default=str)
-                
-                self._cleanup_old_backups(backup_dir)
-                
-            except Exception as e:
-                continue
+        # The history list is only ever appended to (a restore swaps in a
+        # new one), so the writer thread can copy its first ``count``
+        # entries later instead of this thread copying them now. Stats are
+        # derived data and are rebuilt after a restore, so they stay out
+        # of backups.
+        header = {k: v for k, v in user_data.items() if k != "history" and k not in DERIVED_KEYS}
+        history = user_data["history"]
+        count = len(history)
+        self.backup_writer.submit(lambda: {**header, "history": history[:count]},
+                                  self.digest.copy())
+    
+    def _export_sql_backup(self) -> Optional[Dict]:
+        """The SQLite history as backup data, or None if there is none yet"""
+        user_data = self.sql.load(self.SQLITE_USER_ID)
+        if not user_data or not user_data.get("history"):
+            return None
+        for key in DERIVED_KEYS:
+            user_data.pop(key, None)
+        return user_data
+    
+    def flush_backups(self, timeout: Optional[float] = None) -> bool:
+        """Wait for pending background backups to be written"""
+        return self.backup_writer.flush(timeout)
+    
+    def close(self, timeout: Optional[float] = 10.0):
+        """Write pending backups and stop the background threads"""
+        if self.catalog_watcher is not None:
+            self.catalog_watcher.stop(timeout)
+        if not self.backup_writer.close(timeout):
+            print("Warning: backups still pending at exit")
+        if self.sql is not None:
+            self.sql.close()
     
     def _cleanup_old_backups(self, backup_dir: str):
         """Keep only the 5 most recent backups"""
-        try:
-            backup_files = []
-            for filename in os.listdir(backup_dir):
-                if filename.startswith("user_data_backup") and filename.endswith(".json"):
-                    filepath = os.path.join(backup_dir, filename)
-                    backup_files.append((filepath, os.path.getmtime(filepath)))
-            
-            backup_files.sort(key=lambda x: x[1], reverse=True)
-            
-            for filepath, _ in backup_files[5:]:
-                try:
-                    os.remove(filepath)
-                    info_file = filepath.replace("user_data_backup", "backup_info")
-                    if os.path.exists(info_file):
-                        os.remove(info_file)
-                except:
-                    pass
-                    
-        except Exception:
-            pass
+        self.backups.cleanup(backup_dir)
+    
+    def _merge_backups(self, user_data: Dict, found) -> Tuple[HistoryMerge, Optional[Dict], int]:
+        """Merge ``user_data`` with the given backups, one backup in memory at a time.
+        
+        Returns the merge, the header of the newest intact backup (None if
+        none could be read) and how many dates the backups contributed.
+        """
+        merge = HistoryMerge()
+        merge.add_all(user_data.get("history", []))
+        header = None
+        contributed = 0
+        for backup_dir, info in found:
+            try:
+                backup = self.backups.load(backup_dir, info)
+            except Exception as e:
+                print(f"Error reading backup in {backup_dir}: {e}")
+                continue
+            if not backup or not self.backups.verify(backup, info):
+                print(f"Skipping corrupt backup in {backup_dir}")
+                self.backups.invalidate(backup_dir)
+                continue
+            if header is None:
+                header = {k: v for k, v in backup.items()
+                          if k != "history" and k not in DERIVED_KEYS}
+            skipped = merge.skipped
+            contributed += merge.add_all(backup.get("history", []))
+            if merge.skipped > skipped:
+                print(f"Skipped {merge.skipped - skipped} malformed history entries "
+                      f"in backup in {backup_dir}")
+        return merge, header, contributed
     
     def _try_restore_from_backup(self):
-        """Try to restore user data from backup if current data is missing/empty"""
-        current_has_history = bool(self.user_data.get("history"))
-        current_user_data_exists = os.path.exists(self.user_data_file)
+        """Merge in history that only the backups still have.
         
-        # Only restore if we have no history AND (no user data file OR it's empty/minimal)
-        if current_has_history:
+        Backups already contained in the current data are recognized by
+        comparing their info files with the running digest, which is
+        stored with user_data.json and only extended over the journal, so
+        a normal start hashes no more than the journal's entries. An empty
+        or truncated user_data.json, or a backup written by another
+        device, is merged date by date (see HistoryMerge) and saved as the
+        new primary history.
+        """
+        found = self.backups.discover()
+        if not found:
             return
-            
-        # Look for the most recent backup across all locations
-        best_backup = None
-        latest_timestamp = None
-        
-        for backup_dir in self._get_backup_locations():
-            backup_file = os.path.join(backup_dir, "user_data_backup.json")
-            info_file = os.path.join(backup_dir, "backup_info.json")
-            
-            if os.path.exists(backup_file) and os.path.exists(info_file):
-                try:
-                    with open(info_file, 'r', encoding='utf-8') as f:
-                        backup_info = json.load(f)
-                    
-                    backup_timestamp = backup_info.get("timestamp")
-                    if backup_timestamp and (latest_timestamp is None or backup_timestamp > latest_timestamp):
-                        with open(backup_file, 'r', encoding='utf-8') as f:
-                            restored_data = json.load(f)
-                        
-                        if restored_data.get("history"):
-                            best_backup = restored_data
-                            latest_timestamp = backup_timestamp
-                            
-                except Exception as e:
-                    continue
-        
-        # Restore the best backup found
-        if best_backup:
-            self.user_data = best_backup
-            self._save_user_data()
-            print(f"Restored user data from backup ({len(best_backup['history'])} entries)")
-            return
\ No newline at end of file
+        user_data = {k: v for k, v in self.user_data.items() if k not in DERIVED_KEYS}
+        unmerged = self.backups.unmerged(user_data, found, self.digest)
+        if not unmerged:
+            return
+        
+        merge, header, contributed = self._merge_backups(user_data, unmerged)
+        if not contributed:
+            return
+        
+        # With no history of our own, the backup's device id and settings are kept
+        if user_data.get("history") or header is None:
+            header = {k: v for k, v in user_data.items() if k != "history"}
+        self.user_data = {**header, "history": merge.entries()}
+        self.history = HistoryStore(self.user_data["history"])
+        self._save_user_data()
+        conflicts = f", {merge.conflicts} conflicting entries" if merge.conflicts else ""
+        print(f"Restored {contributed} entries from backup ({len(merge)} total{conflicts})")
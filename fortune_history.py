@@ -0,0 +1,111 @@
+"""
+Fortune History
+Date-indexed view over the user's fortune history
+"""
+
+import bisect
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from fortune_records import HistoryEntry
+
+
+class HistoryStore:
+    """Index over ``user_data["history"]`` keyed by date.
+
+    The underlying list is shared, not copied; its dicts are replaced in
+    place by compact ``HistoryEntry`` records, which serialize back to the
+    same JSON shape. All writes must go through ``append`` to keep the
+    indexes in sync.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = entries
+        self._by_date: Dict[str, HistoryEntry] = {}
+        self._ordinals: List[int] = []
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, HistoryEntry):
+                entry = entries[position] = HistoryEntry.from_mapping(entry)
+            self._index(entry)
+
+    def _index(self, entry: HistoryEntry):
+        date_str = entry["date"]
+        if date_str in self._by_date:
+            return
+        self._by_date[date_str] = entry
+        try:
+            ordinal = date.fromisoformat(date_str).toordinal()
+        except (TypeError, ValueError):
+            return
+        if not self._ordinals or ordinal > self._ordinals[-1]:
+            self._ordinals.append(ordinal)
+        else:
+            bisect.insort(self._ordinals, ordinal)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, date_str: str) -> bool:
+        return date_str in self._by_date
+
+    def append(self, entry: Dict):
+        """Add an entry to the history and the indexes"""
+        entry = HistoryEntry.from_mapping(entry)
+        self.entries.append(entry)
+        self._index(entry)
+
+    def date_count(self) -> int:
+        """Number of distinct valid dates recorded"""
+        return len(self._ordinals)
+
+    def get(self, date_str: str) -> Optional[HistoryEntry]:
+        """Return the first entry recorded for a date, or None"""
+        return self._by_date.get(date_str)
+
+    def dates(self, reverse: bool = False) -> List[str]:
+        """Distinct recorded dates in chronological order"""
+        ordinals = reversed(self._ordinals) if reverse else self._ordinals
+        return [date.fromordinal(o).isoformat() for o in ordinals]
+
+    def dates_between(self, start: str, end: str) -> List[str]:
+        """Recorded dates within [start, end] (inclusive), oldest first"""
+        lo = bisect.bisect_left(self._ordinals, date.fromisoformat(start).toordinal())
+        hi = bisect.bisect_right(self._ordinals, date.fromisoformat(end).toordinal())
+        return [date.fromordinal(o).isoformat() for o in self._ordinals[lo:hi]]
+
+    def columns(self) -> Tuple[List[int], List[int]]:
+        """Parallel (ordinals, fortune_ids) lists, one per date, in date order"""
+        by_date = self._by_date
+        if len(by_date) == len(self._ordinals):
+            # Every date is valid ISO, so string order is date order
+            fortune_ids = [by_date[d]["fortune_id"] for d in sorted(by_date)]
+        else:
+            fortune_ids = [by_date[date.fromordinal(o).isoformat()]["fortune_id"]
+                           for o in self._ordinals]
+        return list(self._ordinals), fortune_ids
+
+    def _bounds(self, start: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        lo = 0 if start is None else bisect.bisect_left(
+            self._ordinals, date.fromisoformat(start).toordinal())
+        hi = len(self._ordinals) if end is None else bisect.bisect_right(
+            self._ordinals, date.fromisoformat(end).toordinal())
+        return lo, max(lo, hi)
+
+    def count_between(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Number of recorded dates within [start, end]; None leaves a side open"""
+        lo, hi = self._bounds(start, end)
+        return hi - lo
+
+    def dates_page(self, offset: int, limit: int, start: Optional[str] = None,
+                   end: Optional[str] = None) -> List[str]:
+        """``limit`` dates within [start, end], newest first, skipping ``offset``"""
+        lo, hi = self._bounds(start, end)
+        top = max(hi - max(offset, 0), lo)
+        bottom = max(top - max(limit, 0), lo)
+        return [date.fromordinal(o).isoformat() for o in reversed(self._ordinals[bottom:top])]
+
+    def recent(self, count: int) -> List[HistoryEntry]:
+        """The last ``count`` entries in insertion order"""
+        if count <= 0:
+            return []
+        return self.entries[-count:]
@@ -0,0 +1,368 @@
+"""
+Fortune Instrumentation
+Opt-in timing, I/O and call counters for FortuneManager and the GUI
+
+Disabled unless ``install`` is called (main.py does so for ``--profile``
+or DAILYFORTUNE_PROFILE=1). Until then no method is wrapped, and the
+byte-counting hooks in the storage code cost one global lookup.
+
+When enabled, every instrumented call is logged to a rotating
+``profile.log`` and aggregated into ``metrics.prom`` (Prometheus text
+format) in ~/.dailyfortune. Times are busy times: time spent waiting on
+a modal dialog inside a button handler is left out.
+"""
+
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ENV_VAR = "DAILYFORTUNE_PROFILE"
+
+# Methods wrapped by install(), per component label
+MANAGER_METHODS = (
+    "_load_fortunes", "_read_catalog", "reload_fortunes", "_load_user_data",
+    "_save_user_data", "_append_history_entry", "_create_backup", "flush_backups",
+    "_try_restore_from_backup", "_migrate_to_sqlite", "generate_fortune",
+    "get_todays_fortune", "get_fortune_by_date", "get_available_dates", "get_stats",
+    "get_analytics", "search_fortunes", "count_dates", "get_dates_page"
+)
+BACKUP_METHODS = ("backup", "discover", "load")
+APP_HANDLERS = (
+    "load_initial_state", "generate_fortune", "show_today_fortune", "show_stats",
+    "show_analytics", "show_search", "show_history_selection", "show_historical_fortune"
+)
+# Modal dialogs: counted, but their time is not charged to the caller
+APP_DIALOGS = ("show_message",)
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_recorder: Optional["Recorder"] = None
+
+
+def requested() -> bool:
+    """Whether DAILYFORTUNE_PROFILE asks for instrumentation"""
+    return os.environ.get(ENV_VAR, "").lower() not in ("", "0", "false", "no")
+
+
+def enabled() -> bool:
+    return _recorder is not None
+
+
+def count_bytes(read: int = 0, written: int = 0):
+    """Charge file I/O to the calls in progress on this thread"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add_bytes(read, written)
+
+
+def count_file_read(f):
+    """Charge reading the whole of an open file"""
+    if _recorder is not None:
+        count_bytes(read=os.fstat(f.fileno()).st_size)
+
+
+class _Span:
+    __slots__ = ("key", "start", "read", "written", "excluded")
+
+    def __init__(self, key: Tuple[str, str]):
+        self.key = key
+        self.start = time.perf_counter()
+        self.read = 0
+        self.written = 0
+        self.excluded = 0.0
+
+
+class _Series:
+    """Aggregates for one (component, method)"""
+
+    __slots__ = ("count", "errors", "seconds", "max_seconds", "read", "written", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.read = 0
+        self.written = 0
+        self.buckets = [0] * len(BUCKETS)
+
+
+class Recorder:
+    """Collects spans from any thread and writes the log and metrics files"""
+
+    def __init__(self, log_path: str, metrics_path: str, flush_interval: float = 10.0,
+                 max_log_bytes: int = 1 << 20, log_backups: int = 3):
+        self.metrics_path = metrics_path
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._local = threading.local()
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.max_lag = 0.0
+        # Depth of modal dialogs open on the Tk thread; stalls are not reported inside them
+        self.dialogs = 0
+
+        self.log = logging.getLogger("dailyfortune.profile")
+        self.log.setLevel(logging.INFO)
+        self.log.propagate = False
+        self._handler = RotatingFileHandler(log_path, maxBytes=max_log_bytes,
+                                            backupCount=log_backups, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(message)s"))
+        self.log.addHandler(self._handler)
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, args=(flush_interval,),
+                                         name="metrics-writer", daemon=True)
+        self._flusher.start()
+
+    def _stack(self) -> List[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, key: Tuple[str, str]) -> _Span:
+        span = _Span(key)
+        self._stack().append(span)
+        return span
+
+    def end(self, span: _Span, failed: bool = False, exclude: bool = False):
+        wall = time.perf_counter() - span.start
+        stack = self._stack()
+        stack.remove(span)
+        if exclude:
+            for outer in stack:
+                outer.excluded += wall
+        busy = wall - span.excluded
+
+        with self._lock:
+            series = self._get(span.key)
+            series.count += 1
+            series.errors += failed
+            series.seconds += busy
+            series.max_seconds = max(series.max_seconds, busy)
+            series.read += span.read
+            series.written += span.written
+            for index, bound in enumerate(BUCKETS):
+                if busy <= bound:
+                    series.buckets[index] += 1
+                    break
+
+        component, method = span.key
+        self.log.info("%s.%s %.1fms busy %.1fms wall read=%d written=%d%s",
+                      component, method, busy * 1e3, wall * 1e3, span.read, span.written,
+                      " failed" if failed else "")
+
+    def _get(self, key: Tuple[str, str]) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        return series
+
+    def add_bytes(self, read: int, written: int):
+        stack = self._stack()
+        if stack:
+            for span in stack:
+                span.read += read
+                span.written += written
+            return
+        # I/O outside any instrumented call is charged to the thread
+        with self._lock:
+            series = self._get(("io", threading.current_thread().name))
+            series.read += read
+            series.written += written
+
+    def record_stall(self, lag: float):
+        with self._lock:
+            self.stalls += 1
+            self.stall_seconds += lag
+            self.max_lag = max(self.max_lag, lag)
+        self.log.warning("Tk event loop stalled for %.0fms", lag * 1e3)
+
+    def prometheus(self) -> str:
+        """All counters in Prometheus text exposition format"""
+        with self._lock:
+            series = sorted(self._series.items())
+            stalls, stall_seconds, max_lag = self.stalls, self.stall_seconds, self.max_lag
+
+        lines = [
+            "# HELP dailyfortune_call_seconds Busy time of instrumented calls",
+            "# TYPE dailyfortune_call_seconds histogram"
+        ]
+        for (component, method), s in series:
+            labels = f'component="{component}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, s.buckets):
+                cumulative += count
+                lines.append(f'dailyfortune_call_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'dailyfortune_call_seconds_bucket{{{labels},le="+Inf"}} {s.count}')
+            lines.append(f"dailyfortune_call_seconds_sum{{{labels}}} {s.seconds:.6f}")
+            lines.append(f"dailyfortune_call_seconds_count{{{labels}}} {s.count}")
+        for name, kind, help_text, attr in (
+                ("dailyfortune_call_max_seconds", "gauge", "Slowest call so far", "max_seconds"),
+                ("dailyfortune_call_errors_total", "counter", "Calls that raised", "errors"),
+                ("dailyfortune_read_bytes_total", "counter", "File bytes read", "read"),
+                ("dailyfortune_written_bytes_total", "counter", "File bytes written", "written")):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (component, method), s in series:
+                value = getattr(s, attr)
+                if isinstance(value, float):
+                    value = f"{value:.6f}"
+                lines.append(f'{name}{{component="{component}",method="{method}"}} {value}')
+        lines += [
+            "# HELP dailyfortune_tk_stalls_total Tk event loop stalls",
+            "# TYPE dailyfortune_tk_stalls_total counter",
+            f"dailyfortune_tk_stalls_total {stalls}",
+            "# HELP dailyfortune_tk_stall_seconds_total Time lost to Tk event loop stalls",
+            "# TYPE dailyfortune_tk_stall_seconds_total counter",
+            f"dailyfortune_tk_stall_seconds_total {stall_seconds:.6f}",
+            "# HELP dailyfortune_tk_max_lag_seconds Longest Tk event loop stall",
+            "# TYPE dailyfortune_tk_max_lag_seconds gauge",
+            f"dailyfortune_tk_max_lag_seconds {max_lag:.6f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self):
+        temp_path = self.metrics_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(temp_path, self.metrics_path)
+
+    def _flush_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.write_metrics()
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+
+    def close(self):
+        """Write the final metrics and close the log"""
+        self._stop.set()
+        self._flusher.join()
+        try:
+            self.write_metrics()
+        except OSError as e:
+            print(f"Error writing metrics: {e}")
+        self.log.removeHandler(self._handler)
+        self._handler.close()
+
+
+class TkStallMonitor:
+    """Detects stalls of the Tk event loop.
+
+    A heartbeat scheduled with ``after`` every ``interval`` seconds
+    measures how late it runs; lateness over ``threshold`` is recorded as
+    a stall. A watchdog thread also notices a heartbeat that is overdue
+    while the stall is still going on and logs the Tk thread's stack, so
+    the log shows what the loop was stuck in. Time inside modal dialogs
+    does not count.
+    """
+
+    def __init__(self, root, recorder: Recorder, interval: float = 0.1, threshold: float = 0.5):
+        self.root = root
+        self.recorder = recorder
+        self.interval = interval
+        self.threshold = threshold
+        self._thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._reported = False
+        self._stop = threading.Event()
+        self._watchdog = threading.Thread(target=self._watch, name="tk-watchdog", daemon=True)
+
+    def start(self):
+        self._last_beat = time.perf_counter()
+        self.root.after(int(self.interval * 1000), self._beat)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag = now - self._last_beat - self.interval
+        if lag > self.threshold and not self.recorder.dialogs:
+            self.recorder.record_stall(lag)
+        self._last_beat = now
+        self._reported = False
+        if not self._stop.is_set():
+            self.root.after(int(self.interval * 1000), self._beat)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            overdue = time.perf_counter() - self._last_beat - self.interval
+            if overdue > self.threshold and not self._reported and not self.recorder.dialogs:
+                self._reported = True
+                frame = sys._current_frames().get(self._thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame else "(unavailable)\n"
+                self.recorder.log.warning("Tk event loop blocked for %.0fms in:\n%s",
+                                          overdue * 1e3, stack.rstrip())
+
+
+def _wrap(func, key: Tuple[str, str], dialog: bool):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recorder = _recorder
+        if recorder is None:
+            return func(*args, **kwargs)
+        span = recorder.begin(key)
+        if dialog:
+            recorder.dialogs += 1
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if dialog:
+                recorder.dialogs -= 1
+            recorder.end(span, failed, exclude=dialog)
+    wrapper._instrumented = True
+    return wrapper
+
+
+def instrument(cls, methods: Iterable[str], component: str, dialog: bool = False):
+    """Wrap the named methods of a class in place (idempotent)"""
+    for name in methods:
+        func = cls.__dict__.get(name)
+        if func is None or getattr(func, "_instrumented", False):
+            continue
+        setattr(cls, name, _wrap(func, (component, name), dialog))
+
+
+def install(app_class=None, directory: Optional[str] = None, **recorder_options) -> Recorder:
+    """Enable instrumentation and wrap the manager, backup and (optionally) GUI methods.
+
+    Call before the instances are created, since Tk button commands are
+    bound to the methods that exist at that point.
+    """
+    global _recorder
+    from fortune_backup import BackupManager
+    from fortune_data import FortuneManager
+
+    if _recorder is None:
+        directory = directory or os.path.expanduser("~/.dailyfortune")
+        os.makedirs(directory, exist_ok=True)
+        _recorder = Recorder(os.path.join(directory, "profile.log"),
+                             os.path.join(directory, "metrics.prom"), **recorder_options)
+    instrument(FortuneManager, MANAGER_METHODS, "manager")
+    instrument(BackupManager, BACKUP_METHODS, "backup")
+    if app_class is not None:
+        instrument(app_class, APP_HANDLERS, "app")
+        instrument(app_class, APP_DIALOGS, "dialog", dialog=True)
+    return _recorder
+
+
+def uninstall():
+    """Stop recording; wrapped methods fall through to the originals"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
@@ -0,0 +1,66 @@
+"""
+Fortune History Merge
+Combines the histories of the primary file and its backups into one
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List
+
+from fortune_records import HistoryEntry
+
+
+class HistoryMerge:
+    """Union of several histories with one entry per date.
+
+    Sources are added one after another and only the winning entry for
+    each date is kept, as a compact ``HistoryEntry``, so memory grows with
+    the number of distinct dates rather than with the number or size of
+    the sources. When sources disagree about a date, the entry drawn first
+    (earliest timestamp) wins and equal timestamps go to the smaller
+    fortune id; the result is the same whatever order sources come in.
+    """
+
+    def __init__(self):
+        self._by_date: Dict[str, HistoryEntry] = {}
+        self.conflicts = 0  # Entries that disagreed with their date's winner
+        self.skipped = 0    # Malformed entries
+
+    def __len__(self) -> int:
+        return len(self._by_date)
+
+    @staticmethod
+    def _rank(entry: HistoryEntry):
+        # Entries without a usable timestamp lose to any that have one
+        timestamp = entry.timestamp if isinstance(entry.timestamp, str) else ""
+        return (not timestamp, timestamp, entry.fortune_id)
+
+    def add(self, entry) -> bool:
+        """Offer one entry; returns True if it is now its date's winner"""
+        try:
+            entry = HistoryEntry.from_mapping(entry)
+            if date.fromisoformat(entry.date).isoformat() != entry.date:
+                raise ValueError("date must be YYYY-MM-DD")
+            if not isinstance(entry.fortune_id, int):
+                raise TypeError("fortune_id must be an integer")
+        except (KeyError, TypeError, ValueError, AttributeError):
+            self.skipped += 1
+            return False
+
+        current = self._by_date.get(entry.date)
+        if current is None:
+            self._by_date[entry.date] = entry
+            return True
+        if current.fortune_id != entry.fortune_id:
+            self.conflicts += 1
+        if self._rank(entry) < self._rank(current):
+            self._by_date[entry.date] = entry
+            return True
+        return False
+
+    def add_all(self, entries: Iterable) -> int:
+        """Offer every entry of a source; returns how many dates it won"""
+        return sum(self.add(entry) for entry in entries)
+
+    def entries(self) -> List[HistoryEntry]:
+        """The merged history, oldest date first"""
+        return [self._by_date[date_str] for date_str in sorted(self._by_date)]
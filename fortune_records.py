@@ -0,0 +1,97 @@
+"""
+Fortune Records
+Compact __slots__ records for fortunes and history entries
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Dict, Optional
+
+
+class _Record(Mapping):
+    """Read-only mapping over a fixed set of slot fields.
+
+    A record costs a fraction of an equivalent dict, yet still reads
+    like one (``r["id"]``, ``r.get``, ``{**r}``, ``dict(r)``). Keys
+    outside ``FIELDS`` are kept in ``extra`` so nothing is lost on a
+    load/save round trip.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (type(self).from_mapping, (self.to_dict(),))
+
+    @classmethod
+    def from_mapping(cls, data: Mapping):
+        """Build a record from a dict (or return it if it already is one)"""
+        if isinstance(data, cls):
+            return data
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS} or None
+        return cls(*(data[name] for name in cls.FIELDS), extra=extra)
+
+    def to_dict(self) -> Dict:
+        """Plain dict copy, e.g. for JSON serialization"""
+        return dict(self.items())
+
+
+class Fortune(_Record):
+    """A catalog fortune"""
+
+    __slots__ = ("id", "text", "category")
+    FIELDS = ("id", "text", "category")
+
+    def __init__(self, id: int, text: str, category: str, extra: Optional[Dict] = None):
+        self.id = id
+        self.text = text
+        # Categories repeat across the catalog; share one string per name
+        self.category = sys.intern(category)
+        self.extra = extra
+
+    @classmethod
+    def from_mapping(cls, data: Mapping):
+        if isinstance(data, cls):
+            return data
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS} or None
+        return cls(data["id"], data["text"], data.get("category", ""), extra=extra)
+
+
+class HistoryEntry(_Record):
+    """One day's entry in the user's history"""
+
+    __slots__ = ("date", "fortune_id", "timestamp")
+    FIELDS = ("date", "fortune_id", "timestamp")
+
+    def __init__(self, date: str, fortune_id: int, timestamp: str, extra: Optional[Dict] = None):
+        self.date = date
+        self.fortune_id = fortune_id
+        self.timestamp = timestamp
+        self.extra = extra
+
+    @classmethod
+    def from_mapping(cls, data: Mapping):
+        if isinstance(data, cls):
+            return data
+        if len(data) == 3:
+            # The usual entry has exactly the three fields; skip the extras scan
+            return cls(data["date"], data["fortune_id"], data["timestamp"])
+        return super().from_mapping(data)
@@ -0,0 +1,206 @@
+"""
+Fortune Search
+Inverted index over catalog text for keyword, prefix and category queries
+"""
+
+import bisect
+import hashlib
+import heapq
+import itertools
+import os
+import pickle
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from fortune_instrumentation import count_bytes, count_file_read
+
+INDEX_VERSION = 1
+
+# Han, kana and hangul have no spaces between words, so runs of them are
+# indexed as single characters plus overlapping character pairs
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Index terms for a text: case-folded words, CJK characters and bigrams"""
+    for match in _TOKEN_RE.finditer(text.casefold()):
+        run = match.group()
+        if _CJK_RE.match(run):
+            yield from run
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+        else:
+            yield run
+
+
+def query_terms(text: str) -> List[str]:
+    """Terms a query must all match; CJK runs use bigrams when they can"""
+    terms = []
+    for match in _TOKEN_RE.finditer(text.casefold()):
+        run = match.group()
+        if _CJK_RE.match(run) and len(run) > 1:
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run)
+    return terms
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file, used as the cache key for its catalog"""
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class SearchIndex:
+    """Term and category postings over catalog positions.
+
+    Postings are sorted ``array('I')`` of positions in the catalog, so
+    results come back in catalog order and ``catalog[position]`` gives
+    the fortune. Queries match every term (AND). Multi-term queries walk
+    the shortest posting list and binary-search the others, which stays
+    in the millisecond range on million-fortune catalogs; when matches
+    are too sparse to find by probing, the rest is intersected as sets.
+    A trailing ``*`` (or ``prefix=True`` for the last term) matches any
+    term starting with it.
+    """
+
+    # Candidates checked by binary search before switching to set intersection
+    SCAN_PROBES = 4096
+
+    def __init__(self, catalog, postings: Dict[str, array], categories: Dict[str, array]):
+        self.catalog = catalog
+        self.postings = postings
+        self.categories = categories
+        self._terms = sorted(postings)
+
+    @classmethod
+    def build(cls, catalog) -> "SearchIndex":
+        postings: Dict[str, array] = {}
+        categories: Dict[str, array] = {}
+        for position, fortune in enumerate(catalog):
+            for term in tokenize(fortune["text"]):
+                positions = postings.get(term)
+                if positions is None:
+                    postings[term] = array('I', (position,))
+                elif positions[-1] != position:
+                    positions.append(position)
+            category = fortune.get("category", "").casefold()
+            positions = categories.get(category)
+            if positions is None:
+                categories[category] = array('I', (position,))
+            else:
+                positions.append(position)
+        return cls(catalog, postings, categories)
+
+    @classmethod
+    def load(cls, catalog, path: str, key: str) -> Optional["SearchIndex"]:
+        """Read a cached index if it was built for ``key``, else None"""
+        try:
+            with open(path, 'rb') as f:
+                count_file_read(f)
+                header = pickle.load(f)
+                if header != {"version": INDEX_VERSION, "key": key, "size": len(catalog)}:
+                    return None
+                postings, categories = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return None
+        return cls(catalog, postings, categories)
+
+    def save(self, path: str, key: str):
+        """Write the index atomically, tagged with the catalog key"""
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump({"version": INDEX_VERSION, "key": key, "size": len(self.catalog)}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump((self.postings, self.categories), f, protocol=pickle.HIGHEST_PROTOCOL)
+            count_bytes(written=f.tell())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load_or_build(cls, catalog, path: str, key: str) -> "SearchIndex":
+        index = cls.load(catalog, path, key)
+        if index is None:
+            index = cls.build(catalog)
+            try:
+                index.save(path, key)
+            except OSError as e:
+                print(f"Error caching search index: {e}")
+        return index
+
+    def _expand(self, prefix: str) -> List[array]:
+        """Posting lists of every term starting with ``prefix``"""
+        start = bisect.bisect_left(self._terms, prefix)
+        lists = []
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            lists.append(self.postings[term])
+        return lists
+
+    @staticmethod
+    def _contains(positions: array, position: int) -> bool:
+        index = bisect.bisect_left(positions, position)
+        return index < len(positions) and positions[index] == position
+
+    @staticmethod
+    def _merge(lists: List[array]) -> Iterator[int]:
+        """Sorted union of posting lists, without duplicates"""
+        previous = -1
+        for position in heapq.merge(*lists):
+            if position != previous:
+                yield position
+                previous = position
+
+    def search_positions(self, query: str, category: Optional[str] = None,
+                         limit: int = 50, prefix: bool = False) -> List[int]:
+        """Catalog positions matching every term of ``query``, in catalog order"""
+        terms = query_terms(query)
+        # "lov*" is always a prefix; with prefix=True so is "lov" (not "lov ")
+        if terms and (query.rstrip().endswith("*") or (prefix and not query[-1:].isspace())):
+            terms[-1] += "*"
+
+        # Each requirement is a group of lists; a position must be in one list of every group
+        groups: List[List[array]] = []
+        for term in terms:
+            lists = self._expand(term[:-1]) if term.endswith("*") else (
+                [self.postings[term]] if term in self.postings else [])
+            if not lists:
+                return []
+            groups.append(lists)
+        if category:
+            positions = self.categories.get(category.casefold())
+            if positions is None:
+                return []
+            groups.append([positions])
+        if not groups:
+            return []
+
+        groups.sort(key=lambda lists: sum(len(p) for p in lists))
+        candidates: Iterable[int] = (groups[0][0] if len(groups[0]) == 1
+                                     else self._merge(groups[0]))
+        candidates = iter(candidates)
+        results = []
+        for position in itertools.islice(candidates, self.SCAN_PROBES):
+            if all(any(self._contains(p, position) for p in lists) for lists in groups[1:]):
+                results.append(position)
+                if len(results) >= limit:
+                    return results
+
+        remaining = set(candidates)
+        for lists in groups[1:]:
+            remaining.intersection_update(lists[0] if len(lists) == 1 else set().union(*lists))
+            if not remaining:
+                break
+        return results + heapq.nsmallest(limit - len(results), remaining)
+
+    def search(self, query: str, category: Optional[str] = None,
+               limit: int = 50, prefix: bool = False) -> List:
+        """Fortunes matching ``query`` (and ``category``), in catalog order"""
+        return [self.catalog[position]
+                for position in self.search_positions(query, category, limit, prefix)]
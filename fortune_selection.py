@@ -0,0 +1,136 @@
+"""
+Fortune Selection
+Non-repeating random and deterministic fortune selection
+"""
+
+import hashlib
+import random
+from collections import Counter, deque
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+
+class FortuneSelector:
+    """Draws fortunes while avoiding the ids of the last ``window`` draws.
+
+    Recent ids live in a ring buffer with a counter for membership tests.
+    A draw picks random catalog positions until one is not recent
+    (rejection sampling). That stays uniform over the allowed fortunes,
+    and each draw costs O(1) expected time while the window is small
+    relative to the catalog. Only when the window covers nearly the
+    whole catalog does it fall back to filtering the catalog.
+    """
+
+    # Random probes before falling back to an explicit filtered list
+    MAX_ATTEMPTS = 64
+
+    def __init__(self, catalog, window: int = 30, rng: Optional[random.Random] = None):
+        if window < 0:
+            raise ValueError("window must not be negative")
+        self.catalog = catalog
+        self.window = window
+        self.rng = rng or random
+        self._recent = deque(maxlen=window)
+        self._recent_counts = Counter()
+
+    def load(self, fortune_ids: Iterable[int]):
+        """Seed the exclusion window from past draws, oldest first"""
+        self._recent.clear()
+        self._recent_counts.clear()
+        for fortune_id in fortune_ids:
+            self.record(fortune_id)
+
+    def record(self, fortune_id: int):
+        """Push a drawn id into the exclusion window"""
+        if self.window == 0:
+            return
+        if len(self._recent) == self.window:
+            expired = self._recent.popleft()
+            self._recent_counts[expired] -= 1
+            if not self._recent_counts[expired]:
+                del self._recent_counts[expired]
+        self._recent.append(fortune_id)
+        self._recent_counts[fortune_id] += 1
+
+    def is_recent(self, fortune_id: int) -> bool:
+        return fortune_id in self._recent_counts
+
+    def draw(self):
+        """Pick a random fortune not drawn within the window (does not record it)"""
+        size = len(self.catalog)
+        if not size:
+            raise ValueError("Fortune catalog is empty")
+
+        if len(self._recent_counts) < size:
+            for _ in range(self.MAX_ATTEMPTS):
+                fortune = self.catalog[self.rng.randrange(size)]
+                if fortune["id"] not in self._recent_counts:
+                    return fortune
+
+            available = [f for f in self.catalog if f["id"] not in self._recent_counts]
+            if available:
+                return self.rng.choice(available)
+
+        # Every fortune is recent: allow repeats rather than fail
+        return self.catalog[self.rng.randrange(size)]
+
+
+class DeterministicSelector:
+    """Fortune of the day as a pure function of (user_id, date).
+
+    Each user gets a keyed pseudo-random permutation of the catalog
+    positions (a Feistel network over the next power-of-four domain, with
+    cycle-walking back into range). Day ``d`` maps to position
+    ``perm(d.toordinal() % N)``. Any N consecutive days therefore get N
+    distinct fortunes, so with a catalog larger than the repeat window the
+    no-repeat rule holds without reading any history. The answer depends
+    only on the key, the user id, the date and the catalog order, so any
+    process sharing the key can serve any user.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, catalog, key: bytes):
+        if not key:
+            raise ValueError("key must not be empty")
+        self.catalog = catalog
+        self.key = key[:64]
+        size = len(catalog)
+        self._half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._half_mask = (1 << self._half_bits) - 1
+        self._user_keys: Dict[str, bytes] = {}
+
+    def _user_key(self, user_id: str) -> bytes:
+        user_key = self._user_keys.get(user_id)
+        if user_key is None:
+            if len(self._user_keys) >= 65536:
+                self._user_keys.clear()
+            user_key = hashlib.blake2b(user_id.encode('utf-8'), key=self.key, digest_size=32).digest()
+            self._user_keys[user_id] = user_key
+        return user_key
+
+    def _permute(self, user_key: bytes, value: int) -> int:
+        half, mask = self._half_bits, self._half_mask
+        left, right = value >> half, value & mask
+        for round_number in range(self.ROUNDS):
+            digest = hashlib.blake2b(right.to_bytes(4, 'little') + bytes((round_number,)),
+                                     key=user_key, digest_size=8).digest()
+            left, right = right, left ^ (int.from_bytes(digest, 'little') & mask)
+        return (left << half) | right
+
+    def position(self, user_id: str, day: date) -> int:
+        """Catalog position of the user's fortune for ``day``"""
+        size = len(self.catalog)
+        if not size:
+            raise ValueError("Fortune catalog is empty")
+        user_key = self._user_key(user_id)
+        # Cycle-walk: the domain is at most 4x the catalog, so this takes
+        # fewer than four permutations on average
+        value = self._permute(user_key, day.toordinal() % size)
+        while value >= size:
+            value = self._permute(user_key, value)
+        return value
+
+    def fortune_for(self, user_id: str, day: date):
+        """The user's fortune for ``day``"""
+        return self.catalog[self.position(user_id, day)]
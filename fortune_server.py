@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Fortune HTTP Service
+Headless asyncio HTTP/1.1 server for MultiTenantFortuneManager
+
+Endpoints (JSON responses):
+    GET  /health
+    GET  /users/<user>/today
+    POST /users/<user>/generate
+    GET  /users/<user>/fortunes/<YYYY-MM-DD>
+    GET  /users/<user>/history[?start=YYYY-MM-DD&end=YYYY-MM-DD]
+    GET  /users/<user>/stats
+
+Usage: python fortune_server.py [--host 127.0.0.1] [--port 8080]
+           [--data-dir DIR] [--store files|sqlite] [--catalog fortunes.json]
+           [--seed KEY]
+
+With --seed (or DAILYFORTUNE_SEED) fortunes are deterministic per user and
+date, and /today answers without reading any user data.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from fortune_catalog import load_catalog
+from fortune_sqlite import SQLiteStore
+from fortune_storage import json_default
+from fortune_tenants import MultiTenantFortuneManager, ShardedFileUserStore
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15.0
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class FortuneServer:
+    """Routes HTTP requests to a MultiTenantFortuneManager.
+
+    Manager calls (which may touch disk) run on a thread pool so the
+    event loop never blocks. Generation for a user is serialized by a
+    per-user asyncio lock, so concurrent requests cannot both write a
+    fortune for the same day.
+    """
+
+    def __init__(self, manager: MultiTenantFortuneManager, workers: int = 8):
+        self.manager = manager
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fortune-io")
+        self._user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _user_lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user_id] = lock
+        return lock
+
+    async def _call(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    async def route(self, method: str, target: str) -> Tuple[HTTPStatus, Dict]:
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if parts == ["health"]:
+            return HTTPStatus.OK, {"status": "ok"}
+        if len(parts) < 3 or parts[0] != "users":
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+
+        user_id, action = parts[1], parts[2]
+        if action == "generate" and len(parts) == 3:
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            async with self._user_lock(user_id):
+                if not await self._call(self.manager.can_generate_fortune, user_id):
+                    raise HTTPError(HTTPStatus.CONFLICT, "Fortune already generated for today")
+                fortune = await self._call(self.manager.generate_fortune, user_id)
+            return HTTPStatus.CREATED, fortune
+
+        if method != "GET":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        if action == "today" and len(parts) == 3:
+            if self.manager.deterministic is not None:
+                return HTTPStatus.OK, self.manager.fortune_of_the_day(user_id)
+            fortune = await self._call(self.manager.get_todays_fortune, user_id)
+            if fortune is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "No fortune generated today")
+            return HTTPStatus.OK, fortune
+
+        if action == "fortunes" and len(parts) == 4:
+            _parse_date(parts[3])
+            fortune = await self._call(self.manager.get_fortune_by_date, user_id, parts[3])
+            if fortune is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No fortune for {parts[3]}")
+            return HTTPStatus.OK, fortune
+
+        if action == "history" and len(parts) == 3:
+            if "start" in query or "end" in query:
+                start = query.get("start", date.min.isoformat())
+                end = query.get("end", date.max.isoformat())
+                _parse_date(start)
+                _parse_date(end)
+                dates = await self._call(self.manager.get_dates_between, user_id, start, end)
+            else:
+                dates = await self._call(self.manager.get_available_dates, user_id)
+            return HTTPStatus.OK, {"dates": dates}
+
+        if action == "stats" and len(parts) == 3:
+            return HTTPStatus.OK, await self._call(self.manager.get_stats, user_id)
+
+        raise HTTPError(HTTPStatus.NOT_FOUND)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {"error": "Headers too large"}, keep_alive=False)
+                    return
+
+                try:
+                    method, target, version, headers = _parse_head(head)
+                    length = int(headers.get("content-length", "0"))
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+                except (ValueError, HTTPError) as e:
+                    status = e.status if isinstance(e, HTTPError) else HTTPStatus.BAD_REQUEST
+                    await self._respond(writer, status, {"error": str(e)}, keep_alive=False)
+                    return
+                if length:
+                    await reader.readexactly(length)
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = (connection != "close" if version == "HTTP/1.1"
+                              else connection == "keep-alive")
+
+                try:
+                    status, payload = await self.route(method, target)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: HTTPStatus, payload: Dict,
+                       keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False, default=json_default).encode('utf-8')
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        ).encode('ascii')
+        writer.write(head + body)
+        await writer.drain()
+
+    async def flush_periodically(self, interval: float):
+        """Write back modified user states every ``interval`` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._call(self.manager.flush)
+            except Exception as e:
+                print(f"Error flushing user data: {e}")
+
+    async def close(self):
+        await self._call(self.manager.close)
+        self.executor.shutdown(wait=True)
+
+
+def _parse_head(head: bytes):
+    lines = head.decode('latin-1').split("\r\n")
+    method, target, version = lines[0].split(" ", 2)
+    if not version.startswith("HTTP/1."):
+        raise ValueError(f"Unsupported protocol: {version}")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, version, headers
+
+
+def _parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid date: {value}")
+
+
+def build_manager(data_dir: str, store: str, catalog_path: str, cache_size: int,
+                  seed: Optional[str] = None) -> MultiTenantFortuneManager:
+    os.makedirs(data_dir, exist_ok=True)
+    if store == "sqlite":
+        user_store = SQLiteStore(os.path.join(data_dir, "fortunes.db"))
+    else:
+        user_store = ShardedFileUserStore(os.path.join(data_dir, "users"))
+    return MultiTenantFortuneManager(load_catalog(catalog_path), user_store, cache_size=cache_size,
+                                     seed=seed.encode('utf-8') if seed else None)
+
+
+async def serve(args):
+    manager = build_manager(args.data_dir, args.store, args.catalog, args.cache_size, args.seed)
+    server = FortuneServer(manager, args.workers)
+    tcp = await asyncio.start_server(server.handle_connection, args.host, args.port,
+                                     limit=MAX_HEADER_BYTES)
+    flusher = asyncio.create_task(server.flush_periodically(args.flush_interval))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: fall back to KeyboardInterrupt
+
+    print(f"Serving fortunes on http://{args.host}:{args.port}")
+    try:
+        async with tcp:
+            await stop.wait()
+    finally:
+        flusher.cancel()
+        await server.close()
+        print("User data flushed, server stopped")
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Daily Fortune HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--data-dir", default=os.path.expanduser("~/.dailyfortune/server"))
+    parser.add_argument("--store", choices=["files", "sqlite"], default="files")
+    parser.add_argument("--catalog", default=os.path.join(here, "fortunes.json"))
+    parser.add_argument("--cache-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--flush-interval", type=float, default=5.0)
+    parser.add_argument("--seed", default=os.environ.get("DAILYFORTUNE_SEED"),
+                        help="key for deterministic per-user fortunes")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+SQLite Storage Backend
+User history in an indexed SQLite database (stdlib sqlite3, WAL mode)
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fortune_catalog import missing_fortune
+from fortune_records import HistoryEntry
+from fortune_stats import UNKNOWN_CATEGORY
+from fortune_storage import json_default
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS fortunes (
+    id       INTEGER PRIMARY KEY,
+    text     TEXT NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    data    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    user_id    TEXT NOT NULL,
+    date       TEXT NOT NULL,
+    fortune_id INTEGER NOT NULL,
+    timestamp  TEXT NOT NULL,
+    PRIMARY KEY (user_id, date)
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteStore:
+    """History for any number of users, indexed on (user_id, date).
+
+    Also implements the load/save/close store interface used by
+    MultiTenantFortuneManager. One connection is shared across threads
+    behind a lock; WAL mode keeps readers in other processes unblocked.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql: str, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_meta(self, key: str, value: str):
+        self._write("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def sync_catalog(self, catalog, version: str):
+        """Mirror the catalog into the fortunes table unless already at ``version``"""
+        if self.get_meta("catalog_version") == version:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM fortunes")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO fortunes (id, text, category) VALUES (?, ?, ?)",
+                    ((f["id"], f["text"], f.get("category", "")) for f in catalog))
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                   ("catalog_version", version))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add_entries(self, user_id: str, entries: Iterable, replace: bool = False) -> int:
+        """Insert history entries; existing dates are kept unless ``replace``"""
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.execute("BEGIN")
+            try:
+                self._insert_entries(user_id, entries, replace)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return self._conn.total_changes - before
+
+    def _insert_entries(self, user_id: str, entries: Iterable, replace: bool):
+        # Inside the caller's transaction
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        self._conn.executemany(
+            f"{verb} INTO history (user_id, date, fortune_id, timestamp) VALUES (?, ?, ?, ?)",
+            ((user_id, e["date"], e["fortune_id"], e["timestamp"]) for e in entries))
+
+    def count(self, user_id: str) -> int:
+        return self._query("SELECT COUNT(*) FROM history WHERE user_id = ?", (user_id,))[0][0]
+
+    def entry(self, user_id: str, target_date: str) -> Optional[HistoryEntry]:
+        rows = self._query(
+            "SELECT date, fortune_id, timestamp FROM history WHERE user_id = ? AND date = ?",
+            (user_id, target_date))
+        return HistoryEntry(*rows[0]) if rows else None
+
+    def fortune_by_date(self, user_id: str, target_date: str) -> Optional[Dict]:
+        """History entry joined with its fortune (or a placeholder), in get_fortune_by_date's shape"""
+        rows = self._query(
+            "SELECT h.fortune_id, f.text, f.category, h.timestamp, h.date "
+            "FROM history h LEFT JOIN fortunes f ON f.id = h.fortune_id "
+            "WHERE h.user_id = ? AND h.date = ?",
+            (user_id, target_date))
+        if not rows:
+            return None
+        fortune_id, text, category, timestamp, day = rows[0]
+        fortune = missing_fortune(fortune_id) if text is None else {
+            "id": fortune_id, "text": text, "category": category}
+        return {**fortune, "generated_at": timestamp, "date": day}
+
+    def dates(self, user_id: str, reverse: bool = False) -> List[str]:
+        order = "DESC" if reverse else "ASC"
+        return [row[0] for row in self._query(
+            f"SELECT date FROM history WHERE user_id = ? ORDER BY date {order}", (user_id,))]
+
+    def dates_between(self, user_id: str, start: str, end: str) -> List[str]:
+        return [row[0] for row in self._query(
+            "SELECT date FROM history WHERE user_id = ? AND date BETWEEN ? AND ? ORDER BY date",
+            (user_id, start, end))]
+
+    def count_between(self, user_id: str, start: Optional[str] = None,
+                      end: Optional[str] = None) -> int:
+        return self._query(
+            "SELECT COUNT(*) FROM history WHERE user_id = ? AND date BETWEEN ? AND ?",
+            (user_id, start or date.min.isoformat(), end or date.max.isoformat()))[0][0]
+
+    def dates_page(self, user_id: str, offset: int, limit: int, start: Optional[str] = None,
+                   end: Optional[str] = None) -> List[str]:
+        """Dates within [start, end], newest first, one page at a time"""
+        return [row[0] for row in self._query(
+            "SELECT date FROM history WHERE user_id = ? AND date BETWEEN ? AND ? "
+            "ORDER BY date DESC LIMIT ? OFFSET ?",
+            (user_id, start or date.min.isoformat(), end or date.max.isoformat(),
+             max(limit, 0), max(offset, 0)))]
+
+    def recent(self, user_id: str, count: int) -> List[HistoryEntry]:
+        """The last ``count`` entries by date, oldest first"""
+        rows = self._query(
+            "SELECT date, fortune_id, timestamp FROM history WHERE user_id = ? "
+            "ORDER BY date DESC LIMIT ?", (user_id, max(count, 0)))
+        return [HistoryEntry(*row) for row in reversed(rows)]
+
+    def columns(self, user_id: str) -> Tuple[List[int], List[int]]:
+        """Parallel (ordinals, fortune_ids) lists in date order"""
+        # julianday() of 0001-01-01 is 1721425.5 and its date ordinal is 1
+        rows = self._query(
+            "SELECT CAST(julianday(date) - 1721424.5 AS INTEGER), fortune_id "
+            "FROM history WHERE user_id = ? ORDER BY date", (user_id,))
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    def stats(self, user_id: str, today: Optional[date] = None) -> Dict:
+        """Total, first/last date, streaks and category counts, computed in SQL"""
+        today_str = (today or date.today()).isoformat()
+        total, first, last = self._query(
+            "SELECT COUNT(*), MIN(date), MAX(date) FROM history WHERE user_id = ?", (user_id,))[0]
+        # Walking back from today, a date belongs to the streak while its
+        # age in days equals its rank; the first gap breaks that for good
+        (streak,) = self._query(
+            "SELECT COUNT(*) FROM ("
+            "  SELECT CAST(julianday(?) - julianday(date) AS INTEGER) AS age,"
+            "         ROW_NUMBER() OVER (ORDER BY date DESC) - 1 AS rank"
+            "  FROM history WHERE user_id = ? AND date <= ?"
+            ") WHERE age = rank", (today_str, user_id, today_str))[0]
+        # Consecutive dates share the same (day number - rank) island key
+        (longest,) = self._query(
+            "SELECT COALESCE(MAX(length), 0) FROM ("
+            "  SELECT COUNT(*) AS length FROM ("
+            "    SELECT CAST(julianday(date) AS INTEGER)"
+            "           - ROW_NUMBER() OVER (ORDER BY date) AS island"
+            "    FROM history WHERE user_id = ?"
+            "  ) GROUP BY island"
+            ")", (user_id,))[0]
+        categories = dict(self._query(
+            "SELECT COALESCE(f.category, ?), COUNT(*) "
+            "FROM history h LEFT JOIN fortunes f ON f.id = h.fortune_id "
+            "WHERE h.user_id = ? GROUP BY 1", (UNKNOWN_CATEGORY, user_id)))
+        return {
+            "total_fortunes": total,
+            "streak": streak,
+            "longest_streak": longest,
+            "first_fortune": first,
+            "last_fortune": last,
+            "categories": categories
+        }
+
+    def header(self, user_id: str) -> Optional[Dict]:
+        """A user's data without the history (device id, settings)"""
+        rows = self._query("SELECT data FROM users WHERE user_id = ?", (user_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    # Store interface (MultiTenantFortuneManager)
+
+    def load(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            rows = self._query("SELECT data FROM users WHERE user_id = ?", (user_id,))
+            history = self._query(
+                "SELECT date, fortune_id, timestamp FROM history WHERE user_id = ? ORDER BY date",
+                (user_id,))
+        if not rows and not history:
+            return None
+        user_data = json.loads(rows[0][0]) if rows else {}
+        user_data["history"] = [HistoryEntry(*row) for row in history]
+        return user_data
+
+    def save(self, user_id: str, user_data: Dict):
+        self._save(user_id, user_data, clear=False)
+
+    def replace_user(self, user_id: str, user_data: Dict):
+        """Overwrite a user's data and history completely"""
+        self._save(user_id, user_data, clear=True)
+
+    def _save(self, user_id: str, user_data: Dict, clear: bool):
+        # One transaction, so readers never see the header without its history
+        header = json.dumps({k: v for k, v in user_data.items() if k != "history"},
+                            default=json_default)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if clear:
+                    self._conn.execute("DELETE FROM history WHERE user_id = ?", (user_id,))
+                self._conn.execute("INSERT OR REPLACE INTO users (user_id, data) VALUES (?, ?)",
+                                   (user_id, header))
+                self._insert_entries(user_id, user_data.get("history", []), replace=True)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SQLiteHistory:
+    """HistoryStore-compatible view of one user's history in SQLite"""
+
+    def __init__(self, store: SQLiteStore, user_id: str):
+        self.store = store
+        self.user_id = user_id
+
+    def __len__(self) -> int:
+        return self.store.count(self.user_id)
+
+    def __contains__(self, date_str: str) -> bool:
+        return self.store.entry(self.user_id, date_str) is not None
+
+    def append(self, entry: Dict):
+        self.store.add_entries(self.user_id, [entry])
+
+    def get(self, date_str: str) -> Optional[HistoryEntry]:
+        return self.store.entry(self.user_id, date_str)
+
+    def dates(self, reverse: bool = False) -> List[str]:
+        return self.store.dates(self.user_id, reverse)
+
+    def dates_between(self, start: str, end: str) -> List[str]:
+        return self.store.dates_between(self.user_id, start, end)
+
+    def recent(self, count: int) -> List[HistoryEntry]:
+        return self.store.recent(self.user_id, count)
+
+    def count_between(self, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        return self.store.count_between(self.user_id, start, end)
+
+    def dates_page(self, offset: int, limit: int, start: Optional[str] = None,
+                   end: Optional[str] = None) -> List[str]:
+        return self.store.dates_page(self.user_id, offset, limit, start, end)
+
+    def columns(self) -> Tuple[List[int], List[int]]:
+        return self.store.columns(self.user_id)
@@ -0,0 +1,119 @@
+"""
+Fortune Statistics
+Incrementally maintained totals and streaks over a user's history
+"""
+
+from datetime import date
+from typing import Callable, Dict, Optional
+
+UNKNOWN_CATEGORY = "unknown"
+
+
+class StatsAggregate:
+    """Totals, streaks and per-category counts, updated one day at a time.
+
+    Days are tracked as date ordinals. ``add`` only accepts days after the
+    last one seen, which is the normal case for daily fortunes; anything
+    else (restores, clock changes) needs a ``rebuild`` from the history.
+    The aggregate is stored in ``user_data["stats"]`` and checked against
+    the history on load, so entries that only reached the journal are
+    applied incrementally instead of triggering a full rebuild.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        # Length of the run of consecutive days ending at ``last``
+        self.run = 0
+        self.longest = 0
+        self.categories: Dict[str, int] = {}
+
+    def add(self, ordinal: int, category: str) -> bool:
+        """Count a day after ``last``; returns False if it is not later"""
+        if self.last is not None and ordinal <= self.last:
+            return False
+        self.run = self.run + 1 if self.last is not None and ordinal == self.last + 1 else 1
+        self.longest = max(self.longest, self.run)
+        self.total += 1
+        if self.first is None:
+            self.first = ordinal
+        self.last = ordinal
+        self.categories[category] = self.categories.get(category, 0) + 1
+        return True
+
+    def streak(self, today: date) -> int:
+        """Consecutive days ending today (0 if today has no fortune yet)"""
+        return self.run if self.last == today.toordinal() else 0
+
+    def summary(self, today: date) -> Dict:
+        """Stats in get_stats' shape"""
+        return {
+            "total_fortunes": self.total,
+            "streak": self.streak(today),
+            "longest_streak": self.longest,
+            "first_fortune": date.fromordinal(self.first).isoformat() if self.first else None,
+            "last_fortune": date.fromordinal(self.last).isoformat() if self.last else None,
+            "categories": dict(self.categories)
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "first": date.fromordinal(self.first).isoformat() if self.first else None,
+            "last": date.fromordinal(self.last).isoformat() if self.last else None,
+            "run": self.run,
+            "longest": self.longest,
+            "categories": dict(self.categories)
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> Optional["StatsAggregate"]:
+        """Parse a stored aggregate; None if missing or malformed"""
+        if isinstance(data, StatsAggregate):
+            data = data.to_dict()
+        if not isinstance(data, dict):
+            return None
+        stats = cls()
+        try:
+            stats.total = int(data["total"])
+            stats.first = date.fromisoformat(data["first"]).toordinal() if data["first"] else None
+            stats.last = date.fromisoformat(data["last"]).toordinal() if data["last"] else None
+            stats.run = int(data["run"])
+            stats.longest = int(data["longest"])
+            stats.categories = {str(k): int(v) for k, v in data["categories"].items()}
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return None
+        return stats
+
+    @classmethod
+    def rebuild(cls, history, category_of: Callable[[int], str]) -> "StatsAggregate":
+        """Recompute from a HistoryStore-like index, in date order"""
+        stats = cls()
+        for date_str in history.dates():
+            stats.add(date.fromisoformat(date_str).toordinal(),
+                      category_of(history.get(date_str)["fortune_id"]))
+        return stats
+
+    @classmethod
+    def load(cls, data, history, category_of: Callable[[int], str]) -> "StatsAggregate":
+        """Stored aggregate brought up to date with ``history``.
+
+        Days recorded after the stored ``last`` day are added one by one;
+        if the counts still disagree the aggregate is rebuilt.
+        """
+        stats = cls.from_dict(data)
+        expected = history.date_count()
+        if stats is None or stats.total > expected:
+            return cls.rebuild(history, category_of)
+        if stats.total == expected:
+            return stats
+
+        start = date.fromordinal(stats.last + 1) if stats.last else date.min
+        newer = history.dates_between(start.isoformat(), date.max.isoformat())
+        if stats.total + len(newer) != expected:
+            return cls.rebuild(history, category_of)
+        for date_str in newer:
+            stats.add(date.fromisoformat(date_str).toordinal(),
+                      category_of(history.get(date_str)["fortune_id"]))
+        return stats
@@ -0,0 +1,379 @@
+"""
+Fortune Storage
+Crash-safe file writes and the append-only journal for user history
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+from fortune_instrumentation import count_bytes, count_file_read
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class DurabilityPolicy:
+    """When to fsync after a write.
+
+    ``always`` syncs every write, ``batch`` syncs every ``batch_size``
+    writes and ``never`` leaves flushing to the OS. Atomic renames keep
+    files from being truncated under every policy; the policy only
+    decides how many recent writes a power loss may roll back.
+
+    The batch counter belongs to one writer. Give every other writer
+    its own ``copy``, so one busy file cannot use up another's syncs.
+    """
+
+    ALWAYS = "always"
+    BATCH = "batch"
+    NEVER = "never"
+
+    def __init__(self, mode: str = ALWAYS, batch_size: int = 10):
+        if mode not in (self.ALWAYS, self.BATCH, self.NEVER):
+            raise ValueError(f"Unknown durability mode: {mode}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.mode = mode
+        self.batch_size = batch_size
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, value: Optional[str] = None) -> "DurabilityPolicy":
+        """Parse ``always``, ``never`` or ``batch[:N]`` (default from DAILYFORTUNE_FSYNC)"""
+        if value is None:
+            value = os.environ.get("DAILYFORTUNE_FSYNC", cls.ALWAYS)
+        mode, _, size = value.strip().lower().partition(":")
+        if mode == cls.BATCH and size:
+            return cls(mode, int(size))
+        return cls(mode)
+
+    def copy(self) -> "DurabilityPolicy":
+        """Same policy with its own batch counter"""
+        return DurabilityPolicy(self.mode, self.batch_size)
+
+    def should_sync(self) -> bool:
+        """Record a write and report whether it must be synced"""
+        if self.mode == self.ALWAYS:
+            return True
+        if self.mode == self.NEVER:
+            return False
+        with self._lock:
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._pending = 0
+                return True
+            return False
+
+
+def json_default(obj):
+    """json ``default`` hook: records serialize as dicts, anything else as str"""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    return str(obj)
+
+
+# Encoder/decoder for data files: "orjson", "ujson" or "json" (stdlib).
+# The fastest one installed, unless DAILYFORTUNE_JSON names another.
+_INSTALLED = {"orjson": orjson, "ujson": ujson, "json": json}
+JSON_BACKEND = os.environ.get("DAILYFORTUNE_JSON", "").lower()
+if _INSTALLED.get(JSON_BACKEND) is None:
+    JSON_BACKEND = "orjson" if orjson else "ujson" if ujson else "json"
+
+_COMPACT = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=json_default)
+
+
+def dumps_json(data) -> bytes:
+    """Compact UTF-8 JSON: no indentation and no spaces after separators"""
+    if JSON_BACKEND == "orjson":
+        return orjson.dumps(data, default=json_default)
+    if JSON_BACKEND == "ujson":
+        return ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False,
+                           default=json_default).encode('utf-8')
+    return _COMPACT.encode(data).encode('utf-8')
+
+
+def loads_json(data: bytes):
+    """Parse JSON text with the configured backend"""
+    if JSON_BACKEND == "orjson":
+        return orjson.loads(data)
+    if JSON_BACKEND == "ujson":
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+# Files larger than this are parsed incrementally by read_json
+STREAM_THRESHOLD = 8 << 20
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+_DECODER = json.JSONDecoder()
+
+
+class _JSONStream:
+    """Reads a JSON text from a file one value at a time.
+
+    Only the unparsed tail of the text is buffered. A value that does
+    not fit in the buffer is retried with twice as much read ahead.
+    """
+
+    def __init__(self, f, chunk_size: int = 1 << 16):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self._eof:
+            return False
+        chunk = self._f.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at the end of the text"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill(self._chunk_size):
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consume one of ``chars`` and return it"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed JSON: expected one of {chars!r}, found {char!r}")
+        self._pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete value"""
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, self._pos)
+                # A number cut at the buffer edge decodes as a shorter one, so
+                # only trust values followed by a character no number has
+                if self._eof or _NUMBER_TAIL.match(self._buf, end).end() < len(self._buf):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+    def items(self):
+        """Decode the elements of an array one by one"""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        decode = _DECODER.raw_decode
+        while True:
+            # Fast path: a value already followed by its separator in the buffer
+            buf = self._buf
+            pos = _WHITESPACE.match(buf, self._pos).end()
+            try:
+                value, end = decode(buf, pos)
+                if end < len(buf) and buf[end] in ",]":
+                    self._pos = end + 1
+                    yield value
+                    if buf[end] == "]":
+                        return
+                    continue
+            except json.JSONDecodeError:
+                pass
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def _read_streaming(f, stream_key: str, item_hook: Optional[Callable]) -> Dict:
+    stream = _JSONStream(f)
+    data = {}
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+    else:
+        while True:
+            key = stream.value()
+            if not isinstance(key, str):
+                raise ValueError("Malformed JSON: object keys must be strings")
+            stream.expect(":")
+            if key == stream_key and stream.peek() == "[":
+                items = stream.items()
+                if item_hook:
+                    items = (item for item in map(item_hook, items) if item is not None)
+                data[key] = list(items)
+            else:
+                data[key] = stream.value()
+            if stream.expect(",}") == "}":
+                break
+    if stream.peek():
+        raise ValueError("Malformed JSON: extra data after the top-level object")
+    return data
+
+
+def read_json(path: str, stream_key: Optional[str] = None,
+              item_hook: Optional[Callable] = None):
+    """Load a JSON file, streaming the ``stream_key`` array of large files.
+
+    Files up to STREAM_THRESHOLD bytes are parsed in one go. Larger ones
+    must hold an object; its ``stream_key`` array is decoded element by
+    element, so peak memory stays close to the size of the result rather
+    than the file text plus the result. ``item_hook``, if given, is
+    applied to each element of that array either way; elements it maps
+    to None are dropped.
+    """
+    if stream_key is not None and os.path.getsize(path) > STREAM_THRESHOLD:
+        with open(path, 'r', encoding='utf-8') as f:
+            count_file_read(f)
+            return _read_streaming(f, stream_key, item_hook)
+
+    with open(path, 'rb') as f:
+        text = f.read()
+    count_bytes(read=len(text))
+    data = loads_json(text)
+    if item_hook is not None and isinstance(data, dict) and isinstance(data.get(stream_key), list):
+        data[stream_key] = [item for item in map(item_hook, data[stream_key]) if item is not None]
+    return data
+
+
+def _fsync_dir(path: str):
+    """Persist a rename by syncing the containing directory (POSIX only)"""
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_json(path: str, data, policy: Optional[DurabilityPolicy] = None, **dump_kwargs):
+    """Write JSON to a temp file and rename it over ``path``.
+
+    The compact ``dumps_json`` encoding is used unless ``dump_kwargs``
+    are given, in which case they are passed to ``json.dumps``. Readers
+    see either the previous file or the complete new one, never a
+    truncated write.
+    """
+    payload = json.dumps(data, **dump_kwargs).encode('utf-8') if dump_kwargs else dumps_json(data)
+    sync = policy.should_sync() if policy else False
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+            count_bytes(written=len(payload))
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if sync:
+        _fsync_dir(os.path.dirname(os.path.abspath(path)))
+
+
+class HistoryJournal:
+    """JSON Lines journal of history entries appended since the last snapshot.
+
+    Each generated fortune costs one short append regardless of how long
+    the history is. The owner periodically folds the journal into the
+    full snapshot and calls ``reset``.
+    """
+
+    def __init__(self, path: str, policy: Optional[DurabilityPolicy] = None):
+        self.path = path
+        self.policy = policy
+        self.count = 0
+
+    def load(self) -> List[Dict]:
+        """Read all complete records and cut off a torn trailing line.
+
+        A crash mid-append leaves a partial last record. It is truncated
+        away here, so the next append starts on a fresh line instead of
+        being glued onto the fragment and lost with it.
+        """
+        entries = []
+        if not os.path.exists(self.path):
+            self.count = 0
+            return entries
+
+        with open(self.path, 'rb') as f:
+            count_file_read(f)
+            complete = 0  # Offset just past the last newline
+            tail = b""
+            for line in f:
+                if not line.endswith(b"\n"):
+                    tail = line
+                    break
+                complete += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+
+        if tail:
+            try:
+                # Cut just before its newline: the record itself is whole
+                entries.append(json.loads(tail))
+                torn = False
+            except ValueError:
+                torn = True
+            try:
+                if torn:
+                    with open(self.path, 'r+b') as f:
+                        f.truncate(complete)
+                else:
+                    with open(self.path, 'ab') as f:
+                        f.write(b"\n")
+            except OSError as e:
+                print(f"Error repairing history journal: {e}")
+
+        self.count = len(entries)
+        return entries
+
+    def append(self, entry: Dict):
+        """Append one record to the journal"""
+        line = dumps_json(entry) + b"\n"
+        with open(self.path, 'ab') as f:
+            f.write(line)
+            count_bytes(written=len(line))
+            if self.policy and self.policy.should_sync():
+                f.flush()
+                os.fsync(f.fileno())
+        self.count += 1
+
+    def reset(self):
+        """Discard the journal once its records are in the snapshot"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.count = 0
@@ -0,0 +1,269 @@
+"""
+Multi-tenant Fortune Backend
+Serves many users from one process with a shared catalog
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from fortune_catalog import missing_fortune
+from fortune_history import HistoryStore
+from fortune_records import HistoryEntry
+from fortune_selection import DeterministicSelector, FortuneSelector
+from fortune_stats import UNKNOWN_CATEGORY, StatsAggregate
+from fortune_storage import DurabilityPolicy, atomic_write_json, read_json
+
+
+class MemoryUserStore:
+    """Keeps user data in a dict; for tests and benchmarks"""
+
+    def __init__(self):
+        self._data: Dict[str, Dict] = {}
+
+    def load(self, user_id: str) -> Optional[Dict]:
+        data = self._data.get(user_id)
+        return None if data is None else {**data, "history": list(data["history"])}
+
+    def save(self, user_id: str, user_data: Dict):
+        self._data[user_id] = {**user_data, "history": list(user_data["history"])}
+
+    def close(self):
+        pass
+
+
+class ShardedFileUserStore:
+    """One JSON file per user, spread over 256 shard directories.
+
+    Files are named by a hash of the user id, so arbitrary ids are safe
+    as filenames and no directory grows past a few thousand entries.
+    """
+
+    def __init__(self, root: str, policy: Optional[DurabilityPolicy] = None):
+        self.root = root
+        self.policy = policy
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, user_id: str) -> str:
+        digest = hashlib.sha1(user_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.json")
+
+    def load(self, user_id: str) -> Optional[Dict]:
+        try:
+            return read_json(self._path(user_id), "history")
+        except FileNotFoundError:
+            return None
+
+    def save(self, user_id: str, user_data: Dict):
+        path = self._path(user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_json(path, user_data, self.policy)
+
+    def close(self):
+        pass
+
+
+class UserState:
+    """A user's history, stats, selection window and write-back flags"""
+
+    def __init__(self, user_id: str, user_data: Dict, catalog, repeat_window: int):
+        self.user_id = user_id
+        self.user_data = user_data
+        self.history = HistoryStore(user_data["history"])
+        self.stats = StatsAggregate.load(user_data.get("stats"), self.history,
+                                         lambda fortune_id: _category_of(catalog, fortune_id))
+        user_data["stats"] = self.stats
+        self.selector = FortuneSelector(catalog, repeat_window)
+        self.selector.load(entry["fortune_id"] for entry in self.history.recent(repeat_window))
+        self.lock = threading.Lock()
+        self.dirty = False
+        # Set under ``lock`` once the state has left the cache; holders
+        # must then fetch a fresh one instead of changing this one
+        self.evicted = False
+
+
+def _category_of(catalog, fortune_id: int) -> str:
+    fortune = catalog.get(fortune_id)
+    return fortune.get("category", UNKNOWN_CATEGORY) if fortune else UNKNOWN_CATEGORY
+
+
+class MultiTenantFortuneManager:
+    """FortuneManager logic for many users sharing one immutable catalog.
+
+    Hot user states stay in an LRU cache. Changes are written back to the
+    store when a state is evicted or on ``flush``/``close``. Methods that
+    depend on "today" take an optional date so callers in other time
+    zones, or simulations, can supply their own.
+
+    With a ``seed``, fortunes come from a DeterministicSelector instead
+    of random draws: ``fortune_of_the_day`` answers without loading any
+    user state, and history is kept only for stats and lookups.
+    """
+
+    def __init__(self, catalog, store, cache_size: int = 10_000, repeat_window: int = 30,
+                 seed: Optional[bytes] = None):
+        if cache_size < 1:
+            raise ValueError("cache_size must be at least 1")
+        self.catalog = catalog
+        self.deterministic = DeterministicSelector(catalog, seed) if seed else None
+        self.store = store
+        self.cache_size = cache_size
+        self.repeat_window = repeat_window
+        self._cache: "OrderedDict[str, UserState]" = OrderedDict()
+        self._evicting: Dict[str, UserState] = {}
+        # Set when the one in-flight store.load of a user has finished
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, user_id: str) -> UserState:
+        while True:
+            with self._lock:
+                state = self._cache.get(user_id)
+                if state is not None:
+                    self._cache.move_to_end(user_id)
+                    return state
+                state = self._evicting.get(user_id)
+                if state is not None:
+                    # Still being written back; reuse it rather than read a stale file
+                    self._cache[user_id] = state
+                    return state
+                loading = self._loading.get(user_id)
+                if loading is None:
+                    loading = self._loading[user_id] = threading.Event()
+                    break
+            # Only one load per user at a time: a second one could finish
+            # after the first state was changed and written back, and
+            # replace it with data from before the change
+            loading.wait()
+
+        evicted = []
+        try:
+            user_data = self.store.load(user_id) or {"user_id": user_id, "history": []}
+            state = UserState(user_id, user_data, self.catalog, self.repeat_window)
+            with self._lock:
+                self._cache[user_id] = state
+                while len(self._cache) > self.cache_size:
+                    # Clean states go through write-back too, so they are
+                    # marked evicted under their lock before being dropped
+                    _, old = self._cache.popitem(last=False)
+                    self._evicting[old.user_id] = old
+                    evicted.append(old)
+        finally:
+            with self._lock:
+                del self._loading[user_id]
+            loading.set()
+
+        for old in evicted:
+            self._write_back(old)
+        return state
+
+    def _write_back(self, state: UserState):
+        with state.lock:
+            try:
+                if state.dirty:
+                    self.store.save(state.user_id, state.user_data)
+                    state.dirty = False
+            finally:
+                with self._lock:
+                    if self._evicting.get(state.user_id) is state:
+                        del self._evicting[state.user_id]
+                    # Unless _state put it back in the cache meanwhile
+                    if self._cache.get(state.user_id) is not state:
+                        state.evicted = True
+
+    def can_generate_fortune(self, user_id: str, on_date: Optional[date] = None) -> bool:
+        """Check if the user can get a fortune on the given day"""
+        return (on_date or date.today()).isoformat() not in self._state(user_id).history
+
+    def fortune_of_the_day(self, user_id: str, on_date: Optional[date] = None) -> Dict:
+        """The user's deterministic fortune for the given day; no store access"""
+        if self.deterministic is None:
+            raise ValueError("Deterministic selection requires a seed")
+        return self.deterministic.fortune_for(user_id, on_date or date.today())
+
+    def generate_fortune(self, user_id: str, on_date: Optional[date] = None) -> Dict:
+        """Generate the user's fortune for the given day"""
+        on_date = on_date or date.today()
+        day = on_date.isoformat()
+        while True:
+            state = self._state(user_id)
+            with state.lock:
+                if state.evicted:
+                    # Written back and dropped after _state returned it;
+                    # a change now would never be saved, so fetch it again
+                    continue
+                if day in state.history:
+                    raise ValueError("Fortune already generated for today")
+
+                if self.deterministic is not None:
+                    selected_fortune = self.deterministic.fortune_for(user_id, on_date)
+                else:
+                    selected_fortune = state.selector.draw()
+                history_entry = HistoryEntry(
+                    date=day,
+                    fortune_id=selected_fortune["id"],
+                    timestamp=datetime.now().isoformat()
+                )
+                state.history.append(history_entry)
+                state.selector.record(history_entry.fortune_id)
+                if not state.stats.add(on_date.toordinal(),
+                                       selected_fortune.get("category", UNKNOWN_CATEGORY)):
+                    state.stats = StatsAggregate.rebuild(
+                        state.history, lambda fortune_id: _category_of(self.catalog, fortune_id))
+                    state.user_data["stats"] = state.stats
+                state.dirty = True
+                break
+
+        return {
+            **selected_fortune,
+            "generated_at": history_entry.timestamp
+        }
+
+    def get_fortune_by_date(self, user_id: str, target_date: str) -> Optional[Dict]:
+        """Get the user's fortune for a specific date (YYYY-MM-DD format)"""
+        entry = self._state(user_id).history.get(target_date)
+        if entry:
+            return {
+                **(self.catalog.get(entry["fortune_id"]) or missing_fortune(entry["fortune_id"])),
+                "generated_at": entry["timestamp"],
+                "date": entry["date"]
+            }
+        return None
+
+    def get_todays_fortune(self, user_id: str, on_date: Optional[date] = None) -> Optional[Dict]:
+        """Get the user's fortune for the given day if already generated"""
+        fortune = self.get_fortune_by_date(user_id, (on_date or date.today()).isoformat())
+        if fortune:
+            del fortune["date"]
+        return fortune
+
+    def get_available_dates(self, user_id: str) -> List[str]:
+        """Dates with generated fortunes (sorted newest first)"""
+        return self._state(user_id).history.dates(reverse=True)
+
+    def get_dates_between(self, user_id: str, start_date: str, end_date: str) -> List[str]:
+        """Dates with fortunes within [start_date, end_date] (sorted oldest first)"""
+        return self._state(user_id).history.dates_between(start_date, end_date)
+
+    def get_stats(self, user_id: str, on_date: Optional[date] = None) -> Dict:
+        """User statistics"""
+        return self._state(user_id).stats.summary(on_date or date.today())
+
+    def flush(self):
+        """Write back every modified user state"""
+        with self._lock:
+            states = list(self._cache.values())
+        for state in states:
+            if state.dirty:
+                with state.lock:
+                    if state.dirty:
+                        self.store.save(state.user_id, state.user_data)
+                        state.dirty = False
+
+    def close(self):
+        """Flush and release the store"""
+        self.flush()
+        self.store.close()
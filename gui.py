@@ -5,14 +5,208 @@ Simple, clean interface for fortune display
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 import platform
 import sys
 from fortune_data import FortuneManager
 
+
+@lru_cache(maxsize=4096)
+def format_history_date(date_str: str) -> str:
+    """Listbox label for a history date, cached across pages and windows"""
+    try:
+        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+        return date_obj.strftime("%Y年 %m月 %d日 (%A)")
+    except ValueError:
+        return date_str
+
+
+class HistoryBrowser:
+    """Virtualized list of history dates, newest first.
+
+    The listbox only ever holds the rows on screen. The scrollbar is
+    driven by hand against the total count, and each scroll fetches just
+    the visible page from FortuneManager, so opening and scrolling cost
+    the same however long the history is.
+    """
+    
+    VISIBLE_ROWS = 15
+    
+    def __init__(self, parent, manager: FortuneManager, on_open):
+        self.manager = manager
+        self.on_open = on_open
+        self.start = None
+        self.end = None
+        self.top = 0
+        self.page = []
+        self.total = manager.count_dates()
+        
+        # Date range filter
+        filter_frame = ttk.Frame(parent)
+        filter_frame.pack(fill=tk.X, padx=20)
+        self.start_entry = ttk.Entry(filter_frame, width=11)
+        self.start_entry.pack(side=tk.LEFT)
+        ttk.Label(filter_frame, text="~").pack(side=tk.LEFT, padx=2)
+        self.end_entry = ttk.Entry(filter_frame, width=11)
+        self.end_entry.pack(side=tk.LEFT)
+        ttk.Button(filter_frame, text="篩選", width=5,
+                   command=self.apply_filter).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(filter_frame, text="清除", width=5,
+                   command=self.clear_filter).pack(side=tk.LEFT, padx=(2, 0))
+        
+        # Jump to month; the month list is built only when opened
+        month_frame = ttk.Frame(parent)
+        month_frame.pack(fill=tk.X, padx=20, pady=(5, 0))
+        ttk.Label(month_frame, text="跳至月份:").pack(side=tk.LEFT)
+        self.month_box = ttk.Combobox(month_frame, state="readonly", width=10,
+                                      postcommand=self._fill_months)
+        self.month_box.pack(side=tk.LEFT, padx=(5, 0))
+        self.month_box.bind("<<ComboboxSelected>>",
+                            lambda e: self.jump_to_month(self.month_box.get()))
+        
+        # Date list
+        list_frame = ttk.Frame(parent)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        self.scrollbar = ttk.Scrollbar(list_frame, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(list_frame, font=("Arial", 11), height=self.VISIBLE_ROWS,
+                                  activestyle="dotbox")
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.listbox.bind("<MouseWheel>", self._on_wheel)
+        self.listbox.bind("<Button-4>", self._on_wheel)
+        self.listbox.bind("<Button-5>", self._on_wheel)
+        self.listbox.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.listbox.bind("<Down>", lambda e: self._on_arrow(1))
+        self.listbox.bind("<Prior>", lambda e: self._scroll_by(-self.VISIBLE_ROWS))
+        self.listbox.bind("<Next>", lambda e: self._scroll_by(self.VISIBLE_ROWS))
+        self.listbox.bind("<Home>", lambda e: self._scroll_by(-self.total))
+        self.listbox.bind("<End>", lambda e: self._scroll_by(self.total))
+        self.listbox.bind("<Double-1>", lambda e: self.open_selected())
+        self.listbox.bind("<Return>", lambda e: self.open_selected())
+        
+        self.refresh()
+    
+    def refresh(self):
+        """Show the page starting at ``top``"""
+        self.page = self.manager.get_dates_page(self.top, self.VISIBLE_ROWS, self.start, self.end)
+        self.listbox.delete(0, tk.END)
+        if self.page:
+            self.listbox.insert(tk.END, *(format_history_date(d) for d in self.page))
+        if self.total:
+            self.scrollbar.set(self.top / self.total,
+                               min(1.0, (self.top + len(self.page)) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def scroll_to(self, top: int):
+        top = max(0, min(top, self.total - self.VISIBLE_ROWS))
+        if top != self.top:
+            self.top = top
+            self.refresh()
+    
+    def _scroll_by(self, rows: int):
+        self.scroll_to(self.top + rows)
+        return "break"
+    
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self.total))
+        elif action == "scroll":
+            step = self.VISIBLE_ROWS if args[1] == "pages" else 1
+            self.scroll_to(self.top + int(args[0]) * step)
+    
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        return self._scroll_by(-3 if up else 3)
+    
+    def _on_arrow(self, step: int):
+        selection = self.listbox.curselection()
+        index = (selection[0] if selection else -1) + step
+        if index < 0:
+            self._scroll_by(-1)
+            index = 0
+        elif index >= len(self.page):
+            self._scroll_by(1)
+            index = len(self.page) - 1
+        self.listbox.selection_clear(0, tk.END)
+        if self.page:
+            self.listbox.selection_set(index)
+            self.listbox.activate(index)
+        return "break"
+    
+    def selected_date(self):
+        selection = self.listbox.curselection()
+        return self.page[selection[0]] if selection else None
+    
+    def open_selected(self):
+        self.on_open(self.selected_date())
+    
+    def apply_filter(self):
+        """Restrict the list to the dates typed in the range boxes"""
+        bounds = []
+        for entry in (self.start_entry, self.end_entry):
+            value = entry.get().strip()
+            if value:
+                try:
+                    value = date.fromisoformat(value).isoformat()
+                except ValueError:
+                    messagebox.showerror("篩選", f"日期格式錯誤: {value}\n請使用 YYYY-MM-DD",
+                                         parent=self.listbox)
+                    return
+            bounds.append(value or None)
+        self.start, self.end = bounds
+        self._reset()
+    
+    def clear_filter(self):
+        self.start_entry.delete(0, tk.END)
+        self.end_entry.delete(0, tk.END)
+        self.start = self.end = None
+        self._reset()
+    
+    def _reset(self):
+        self.total = self.manager.count_dates(self.start, self.end)
+        self.top = 0
+        self.month_box.set("")
+        self.refresh()
+    
+    def _fill_months(self):
+        """Months from the newest to the oldest date in the current range"""
+        if not self.total:
+            self.month_box["values"] = []
+            return
+        newest = date.fromisoformat(
+            self.manager.get_dates_page(0, 1, self.start, self.end)[0])
+        oldest = date.fromisoformat(
+            self.manager.get_dates_page(self.total - 1, 1, self.start, self.end)[0])
+        months = []
+        year, month = newest.year, newest.month
+        while (year, month) >= (oldest.year, oldest.month):
+            months.append(f"{year:04d}-{month:02d}")
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        self.month_box["values"] = months
+    
+    def jump_to_month(self, month: str):
+        """Scroll to and select the newest date within ``month``"""
+        year, month_number = map(int, month.split("-"))
+        next_month = date(year + month_number // 12, month_number % 12 + 1, 1)
+        after = next_month.isoformat()
+        if self.start and self.start > after:
+            after = self.start
+        newer = self.manager.count_dates(after, self.end) if not self.end or after <= self.end else 0
+        self.scroll_to(newer)
+        index = newer - self.top
+        self.listbox.selection_clear(0, tk.END)
+        if 0 <= index < len(self.page):
+            self.listbox.selection_set(index)
+            self.listbox.activate(index)
+
 class FortuneApp:
-    def __init__(self):
-        self.fortune_manager = FortuneManager()
+    def __init__(self, lazy: bool = True):
+        # In lazy mode user data and the catalog load after the window is shown
+        self.lazy = lazy
+        self.fortune_manager = FortuneManager(lazy=lazy)
         self.root = tk.Tk()
         self.setup_window()
         self.create_widgets()
@@ -98,14 +292,37 @@ class FortuneApp:
                                 command=self.root.quit)
         quit_button.grid(row=0, column=3, padx=(2, 0), pady=(0, 5), sticky=(tk.W, tk.E))
         
-        # Second row - history button spanning full width
+        # Second row - history and analytics buttons
         history_button = ttk.Button(button_frame, text="歷史籤餅", 
                                    command=self.show_history_selection)
-        history_button.grid(row=1, column=0, columnspan=4, sticky=(tk.W, tk.E))
+        history_button.grid(row=1, column=0, columnspan=2, padx=(0, 2), sticky=(tk.W, tk.E))
+        
+        analytics_button = ttk.Button(button_frame, text="詳細分析", 
+                                     command=self.show_analytics)
+        analytics_button.grid(row=1, column=2, columnspan=2, padx=(2, 0), sticky=(tk.W, tk.E))
+        
+        # Third row - catalog search
+        search_button = ttk.Button(button_frame, text="搜尋籤餅", 
+                                  command=self.show_search)
+        search_button.grid(row=2, column=0, columnspan=4, pady=(5, 0), sticky=(tk.W, tk.E))
         
         # Load existing fortune or show welcome message
-        self.load_initial_state()
+        if self.lazy:
+            self.display_message("載入中...")
+            # Load only once the window has actually been drawn
+            self._load_pending = True
+            self.fortune_text.bind("<Expose>", self._on_first_expose, add="+")
+        else:
+            self.load_initial_state()
         
+    def _on_first_expose(self, event):
+        """Start the deferred load after the first frame is on screen"""
+        if not self._load_pending:
+            return
+        self._load_pending = False
+        # after_idle lets Tk finish drawing the rest of this frame first
+        self.root.after_idle(lambda: self.root.after(0, self.load_initial_state))
+    
     def load_initial_state(self):
         """Load today's fortune if it exists, or show welcome message"""
         existing_fortune = self.fortune_manager.get_todays_fortune()
@@ -221,6 +438,7 @@ class FortuneApp:
 
 總共獲得籤餅: {stats['total_fortunes']} 次
 目前連續天數: {stats['streak']} 天
+最長連續天數: {stats['longest_streak']} 天
 首次籤餅: {stats['first_fortune']}
 最新籤餅: {stats['last_fortune']}
 
@@ -231,19 +449,161 @@ class FortuneApp:
         except Exception as e:
             self.show_message("錯誤", f"載入統計資料失敗: {str(e)}", "error")
     
+    def show_analytics(self):
+        """Show category, calendar, streak and reuse analytics in a window"""
+        try:
+            analytics = self.fortune_manager.get_analytics()
+            
+            if not analytics["reuse"]["total"]:
+                self.show_message("詳細分析", "尚未生成籤餅！\n獲取您的第一個籤餅來查看分析。")
+                return
+            
+            analytics_window = tk.Toplevel(self.root)
+            analytics_window.title("籤餅分析")
+            analytics_window.geometry("460x420")
+            analytics_window.transient(self.root)
+            
+            notebook = ttk.Notebook(analytics_window)
+            notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            
+            total = analytics["reuse"]["total"]
+            categories = [(name.title(), count) for name, count in analytics["categories"].items()]
+            weekday_names = ["一", "二", "三", "四", "五", "六", "日"]
+            weekdays = [(f"週{name}", count)
+                        for name, count in zip(weekday_names, analytics["weekdays"].values())]
+            months = [(f"{month}月", count) for month, count in analytics["months"].items()]
+            
+            for title, rows in (("類別", categories), ("星期", weekdays), ("月份", months)):
+                tab = ttk.Frame(notebook, padding=10)
+                notebook.add(tab, text=title)
+                self._draw_bar_chart(tab, rows, total)
+            
+            streak = analytics["longest_streak"]
+            gaps = analytics["gaps"]
+            reuse = analytics["reuse"]
+            lines = [
+                f"最長連續天數: {streak['length']} 天 ({streak['start']} ~ {streak['end']})",
+                f"中斷次數: {gaps['count']} 次，共錯過 {gaps['missed_days']} 天",
+            ]
+            if gaps["longest"]:
+                longest_gap = gaps["longest"]
+                lines.append(f"最長中斷: {longest_gap['days']} 天 "
+                             f"({longest_gap['start']} ~ {longest_gap['end']})")
+            lines += [
+                "",
+                f"不重複籤餅: {reuse['unique_fortunes']} / {reuse['total']}",
+                f"重複率: {reuse['reuse_rate']:.1%}",
+                f"籤餅庫覆蓋率: {reuse['catalog_coverage']:.1%}",
+            ]
+            summary_tab = ttk.Frame(notebook, padding=10)
+            notebook.add(summary_tab, text="連續與重複")
+            ttk.Label(summary_tab, text="\n".join(lines), justify=tk.LEFT,
+                      font=("Microsoft JhengHei", 11)).pack(anchor=tk.W)
+            
+            ttk.Button(analytics_window, text="關閉",
+                       command=analytics_window.destroy).pack(pady=(0, 10))
+            
+        except Exception as e:
+            self.show_message("錯誤", f"載入分析資料失敗: {str(e)}", "error")
+    
+    def _draw_bar_chart(self, parent, rows, total):
+        """Horizontal bars with counts and percentages, one row per (label, count)"""
+        canvas = tk.Canvas(parent, bg="#f8f9fa", highlightthickness=0)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        peak = max((count for _, count in rows), default=0) or 1
+        row_height, label_width, bar_width = 24, 90, 200
+        for i, (label, count) in enumerate(rows):
+            y = 10 + i * row_height
+            canvas.create_text(label_width - 8, y + 8, text=label, anchor=tk.E,
+                               font=("Microsoft JhengHei", 10))
+            length = bar_width * count / peak
+            if length:
+                canvas.create_rectangle(label_width, y, label_width + length, y + 16,
+                                        fill="#5b8def", outline="")
+            canvas.create_text(label_width + length + 6, y + 8, anchor=tk.W,
+                               text=f"{count} ({count / total:.0%})", font=("Arial", 9))
+    
+    def show_search(self):
+        """Search the fortune catalog by keyword and category"""
+        try:
+            all_categories = "全部"
+            categories = [all_categories] + sorted(self.fortune_manager.fortunes.categories())
+            
+            search_window = tk.Toplevel(self.root)
+            search_window.title("搜尋籤餅")
+            search_window.geometry("460x420")
+            search_window.transient(self.root)
+            
+            query_frame = ttk.Frame(search_window)
+            query_frame.pack(fill=tk.X, padx=20, pady=(15, 5))
+            query_entry = ttk.Entry(query_frame, font=("Microsoft JhengHei", 11))
+            query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+            category_box = ttk.Combobox(query_frame, values=categories, state="readonly", width=12)
+            category_box.set(all_categories)
+            category_box.pack(side=tk.LEFT, padx=(5, 0))
+            
+            status_label = ttk.Label(search_window, text="輸入關鍵字搜尋（支援字首與中文）")
+            status_label.pack(anchor=tk.W, padx=20)
+            
+            list_frame = ttk.Frame(search_window)
+            list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+            scrollbar = ttk.Scrollbar(list_frame)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            result_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set,
+                                        font=("Arial", 11))
+            result_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            scrollbar.config(command=result_listbox.yview)
+            
+            results = []
+            pending = [None]
+            limit = 200
+            
+            def run_search():
+                pending[0] = None
+                query = query_entry.get()
+                category = category_box.get()
+                category = None if category == all_categories else category
+                results[:] = self.fortune_manager.search_fortunes(
+                    query, category, limit=limit, prefix=True) if query.strip() or category else []
+                result_listbox.delete(0, tk.END)
+                if results:
+                    result_listbox.insert(tk.END, *(f"[{f['category'].title()}] {f['text']}"
+                                                    for f in results))
+                more = "+" if len(results) >= limit else ""
+                status_label.config(text=f"找到 {len(results)}{more} 個籤餅")
+            
+            def schedule_search(event=None):
+                # Search once typing pauses instead of on every keystroke
+                if pending[0] is not None:
+                    search_window.after_cancel(pending[0])
+                pending[0] = search_window.after(150, run_search)
+            
+            def on_open(event=None):
+                selection = result_listbox.curselection()
+                if selection:
+                    fortune = results[selection[0]]
+                    self.show_message("籤餅內容", f'"{fortune["text"]}"\n\n類別: {fortune["category"].title()}')
+            
+            query_entry.bind("<KeyRelease>", schedule_search)
+            category_box.bind("<<ComboboxSelected>>", schedule_search)
+            result_listbox.bind("<Double-1>", on_open)
+            result_listbox.bind("<Return>", on_open)
+            query_entry.focus_set()
+            
+        except Exception as e:
+            self.show_message("錯誤", f"無法搜尋籤餅: {str(e)}", "error")
+    
     def show_history_selection(self):
         """Show date selection window for fortune history"""
         try:
-            available_dates = self.fortune_manager.get_available_dates()
-            
-            if not available_dates:
+            if not self.fortune_manager.count_dates():
                 self.show_message("歷史籤餅", "尚無歷史籤餅記錄！\n開始使用後，您可以在這裡查看過往的籤餅。")
                 return
             
             # Create selection window
             history_window = tk.Toplevel(self.root)
             history_window.title("選擇日期")
-            history_window.geometry("300x400")
+            history_window.geometry("340x480")
             history_window.resizable(False, False)
             
             # Center the window
@@ -255,52 +615,30 @@ class FortuneApp:
                                    font=("Microsoft JhengHei", 14, "bold"))
             title_label.pack(pady=10)
             
-            # Date list frame
-            list_frame = ttk.Frame(history_window)
-            list_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
-            
-            # Scrollable listbox
-            scrollbar = ttk.Scrollbar(list_frame)
-            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-            
-            date_listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set,
-                                     font=("Arial", 11), height=15)
-            date_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            scrollbar.config(command=date_listbox.yview)
+            def on_open(selected_date):
+                if selected_date:
+                    history_window.destroy()
+                    self.show_historical_fortune(selected_date)
+                else:
+                    self.show_message("選擇日期", "請選擇一個日期！")
             
-            # Populate dates with formatted display
-            for date_str in available_dates:
-                try:
-                    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                    formatted_date = date_obj.strftime("%Y年 %m月 %d日 (%A)")
-                    date_listbox.insert(tk.END, formatted_date)
-                except:
-                    date_listbox.insert(tk.END, date_str)
+            # Only the visible page of dates is loaded and formatted
+            browser = HistoryBrowser(history_window, self.fortune_manager, on_open)
             
             # Button frame
             button_frame = ttk.Frame(history_window)
             button_frame.pack(pady=10)
             
-            def on_show_fortune():
-                selection = date_listbox.curselection()
-                if selection:
-                    selected_date = available_dates[selection[0]]
-                    history_window.destroy()
-                    self.show_historical_fortune(selected_date)
-                else:
-                    self.show_message("選擇日期", "請選擇一個日期！")
-            
             def on_cancel():
                 history_window.destroy()
             
-            show_button = ttk.Button(button_frame, text="查看籤餅", command=on_show_fortune)
+            show_button = ttk.Button(button_frame, text="查看籤餅", command=browser.open_selected)
             show_button.pack(side=tk.LEFT, padx=(0, 10))
             
             cancel_button = ttk.Button(button_frame, text="取消", command=on_cancel)
             cancel_button.pack(side=tk.LEFT)
             
-            # Double-click to show
-            date_listbox.bind('<Double-1>', lambda e: on_show_fortune())
+            browser.listbox.focus_set()
             
         except Exception as e:
             self.show_message("錯誤", f"無法顯示歷史記錄: {str(e)}", "error")
@@ -336,4 +674,6 @@ class FortuneApp:
             self.root.quit()
         except Exception as e:
             self.show_message("應用程式錯誤", f"發生未預期的錯誤: {str(e)}", "error")
-            self.root.quit()
\ No newline at end of file
+            self.root.quit()
+        finally:
+            self.fortune_manager.close()
\ No newline at end of file
@@ -2,19 +2,38 @@
 """
 Daily Fortune App - Main Entry Point
 Simple offline fortune application with daily limit
+
+Usage: python main.py [--profile]
+--profile (or DAILYFORTUNE_PROFILE=1) records call timings, file I/O and
+Tk stalls to ~/.dailyfortune/profile.log and metrics.prom.
 """
 
+import argparse
 import sys
 import os
+import fortune_instrumentation
 from gui import FortuneApp
 
 def main():
+    parser = argparse.ArgumentParser(description="Daily Fortune")
+    parser.add_argument("--profile", action="store_true",
+                        help="record timings to ~/.dailyfortune/profile.log and metrics.prom")
+    # Bundled apps may be started with extra platform arguments
+    args, _ = parser.parse_known_args()
+
+    recorder = None
     try:
+        if args.profile or fortune_instrumentation.requested():
+            recorder = fortune_instrumentation.install(FortuneApp)
         app = FortuneApp()
+        if recorder is not None:
+            fortune_instrumentation.TkStallMonitor(app.root, recorder).start()
         app.run()
     except Exception as e:
         print(f"Error starting application: {e}")
         sys.exit(1)
+    finally:
+        fortune_instrumentation.uninstall()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()